@@ -12,13 +12,15 @@ Major improvements:
 
 import asyncio
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Optional, Set
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
 from pathlib import Path
 
 import structlog
-from sqlalchemy import func
+from sqlalchemy import exists, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from config.db import get_db_session, engine
@@ -36,13 +38,17 @@ class ConcurrentBackfillJob:
     FORM_TYPES = ['10-K', '10-K/A', '10-Q', '10-Q/A']
     START_DATE = datetime(2023, 1, 1)
     END_DATE = datetime(2025, 12, 31)
+    MAX_RECENT_ERRORS = 200
+    DOWNLOAD_QUEUE_SIZE = 1000
 
     def __init__(
         self,
         max_concurrent_companies: int = 10,
         max_concurrent_downloads: int = 5,
         download_as_discover: bool = True,
-        exchanges: List[str] = None
+        exchanges: List[str] = None,
+        sec_cache_dir: Optional[str] = None,
+        sec_cache_ttl: Optional[int] = None
     ):
         """
         Initialize concurrent backfill job.
@@ -52,26 +58,44 @@ class ConcurrentBackfillJob:
             max_concurrent_downloads: How many artifacts to download concurrently
             download_as_discover: Start downloads immediately as artifacts are discovered
             exchanges: Filter by specific exchanges (None = all)
+            sec_cache_dir: Directory for cached SEC submissions JSON
+                (None = no caching)
+            sec_cache_ttl: Seconds a cached submissions response stays fresh
+                (None = SECAPIClient.CACHE_TTL)
         """
-        self.sec_client = SECAPIClient()
+        self.sec_client = SECAPIClient(
+            cache_dir=sec_cache_dir,
+            cache_ttl=sec_cache_ttl,
+            async_pool_size=max_concurrent_companies
+        )
         self.downloader = ArtifactDownloader()
         self.max_concurrent_companies = max_concurrent_companies
         self.max_concurrent_downloads = max_concurrent_downloads
         self.download_as_discover = download_as_discover
+        # Dedicated pool sized to the download limit, so the semaphore (not the
+        # default executor's cpu-based size) is the real concurrency ceiling
+        self.download_executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_downloads,
+            thread_name_prefix='artifact-download'
+        )
         self.exchanges = exchanges or ['NASDAQ', 'NYSE', 'NYSE American', 'NYSE Arca']
 
         # Progress tracking
-        self.stats = {
+        self.stats = Counter({
             'companies_processed': 0,
             'companies_with_new_filings': 0,
             'filings_discovered': 0,
             'artifacts_created': 0,
             'artifacts_downloaded': 0,
             'artifacts_failed': 0,
-            'errors': []
-        }
+            'errors_total': 0
+        })
+        # Only the most recent errors are kept so long runs don't grow unbounded
+        self.errors = deque(maxlen=self.MAX_RECENT_ERRORS)
         self.start_time = None
         self.companies_in_progress: Set[str] = set()
+        # Discovery -> download pipeline; created in run_async
+        self.download_queue: Optional[asyncio.Queue] = None
 
     def determine_fiscal_period(self, form_type: str, report_date: str) -> str:
         """Determine fiscal period from form type and report date."""
@@ -109,13 +133,8 @@ class ConcurrentBackfillJob:
         self.companies_in_progress.add(ticker)
 
         try:
-            # Fetch submissions from SEC
-            loop = asyncio.get_event_loop()
-            submissions = await loop.run_in_executor(
-                None,
-                self.sec_client.fetch_company_submissions,
-                cik
-            )
+            # Fetch submissions from SEC (native async, no worker thread)
+            submissions = await self.sec_client.afetch_company_submissions(cik)
 
             # Parse filings
             filings_data = self.sec_client.parse_filings(
@@ -139,13 +158,13 @@ class ConcurrentBackfillJob:
             artifact_ids_to_download = []
 
             with get_db_session() as session:
-                for filing_data in filings_data:
-                    # Check if filing exists
-                    existing = session.query(Filing).filter(
-                        Filing.accession_number == filing_data['accession_number']
-                    ).first()
+                # Existing filings are skipped by ON CONFLICT below; this set
+                # only drops duplicates within the SEC response itself
+                seen_accessions = set()
 
-                    if existing:
+                filing_rows = []
+                for filing_data in filings_data:
+                    if filing_data['accession_number'] in seen_accessions:
                         continue
 
                     # Determine fiscal year and period
@@ -165,45 +184,66 @@ class ConcurrentBackfillJob:
                         report_date_str
                     )
 
-                    # Create filing record
-                    filing = Filing(
-                        company_id=company_id,
-                        accession_number=filing_data['accession_number'],
-                        form_type=filing_data['form_type'],
-                        filing_date=filing_data['filing_date'],
-                        report_date=report_date,
-                        fiscal_year=fiscal_year,
-                        fiscal_period=fiscal_period,
-                        primary_document=filing_data.get('primary_document'),
-                        document_count=filing_data.get('document_count', 0),
-                        is_amendment=filing_data.get('is_amendment', False)
-                    )
-                    session.add(filing)
-                    session.flush()  # Get filing.id
+                    filing_rows.append({
+                        'company_id': company_id,
+                        'accession_number': filing_data['accession_number'],
+                        'form_type': filing_data['form_type'],
+                        'filing_date': filing_data['filing_date'],
+                        'report_date': report_date,
+                        'fiscal_year': fiscal_year,
+                        'fiscal_period': fiscal_period,
+                        'primary_document': filing_data.get('primary_document'),
+                        'document_count': filing_data.get('document_count', 0),
+                        'is_amendment': filing_data.get('is_amendment', False)
+                    })
+                    seen_accessions.add(filing_data['accession_number'])
+
+                if filing_rows:
+                    # Insert in one statement; filings that already exist (or were
+                    # inserted concurrently) are skipped by the unique constraint,
+                    # so RETURNING yields exactly the new rows
+                    filing_ids = {
+                        accession_number: filing_id
+                        for filing_id, accession_number in session.execute(
+                            pg_insert(Filing)
+                            .on_conflict_do_nothing(index_elements=['accession_number'])
+                            .returning(Filing.id, Filing.accession_number),
+                            filing_rows
+                        )
+                    }
+
+                    # Create artifacts for primary HTML documents of new filings
+                    artifact_rows = []
+                    for filing_row in filing_rows:
+                        if filing_row['accession_number'] not in filing_ids:
+                            continue
+
+                        primary_doc = filing_row['primary_document']
+                        if not primary_doc:
+                            continue
 
-                    # Create artifact for primary HTML document
-                    primary_doc = filing_data.get('primary_document')
-                    if primary_doc:
-                        accession_no_dashes = filing_data['accession_number'].replace('-', '')
+                        accession_no_dashes = filing_row['accession_number'].replace('-', '')
                         html_url = (
                             f"https://www.sec.gov/Archives/edgar/data/{cik}/"
                             f"{accession_no_dashes}/{primary_doc}"
                         )
 
-                        artifact = Artifact(
-                            filing_id=filing.id,
-                            artifact_type='html',
-                            filename=primary_doc,
-                            url=html_url,
-                            status='pending_download'
-                        )
-                        session.add(artifact)
-                        session.flush()  # Get artifact.id
+                        artifact_rows.append({
+                            'filing_id': filing_ids[filing_row['accession_number']],
+                            'artifact_type': 'html',
+                            'filename': primary_doc,
+                            'url': html_url,
+                            'status': 'pending_download'
+                        })
 
-                        artifact_ids_to_download.append(artifact.id)
-                        artifacts_created += 1
+                    if artifact_rows:
+                        artifact_ids_to_download = list(session.execute(
+                            insert(Artifact).returning(Artifact.id),
+                            artifact_rows
+                        ).scalars())
 
-                    new_filings += 1
+                    new_filings = len(filing_ids)
+                    artifacts_created = len(artifact_rows)
 
                 session.commit()
 
@@ -214,9 +254,11 @@ class ConcurrentBackfillJob:
             self.stats['filings_discovered'] += new_filings
             self.stats['artifacts_created'] += artifacts_created
 
-            # Download artifacts immediately if enabled
-            if self.download_as_discover and artifact_ids_to_download:
-                await self.download_artifacts(artifact_ids_to_download)
+            # Hand artifacts to the download workers so this company's
+            # discovery slot is released without waiting for downloads
+            if self.download_as_discover:
+                for artifact_id in artifact_ids_to_download:
+                    await self.download_queue.put(artifact_id)
 
             logger.info(
                 "company_processed",
@@ -234,7 +276,8 @@ class ConcurrentBackfillJob:
 
         except Exception as e:
             error_msg = f"{ticker}: {str(e)}"
-            self.stats['errors'].append(error_msg)
+            self.stats['errors_total'] += 1
+            self.errors.append(error_msg)
             logger.error(
                 "company_processing_failed",
                 ticker=ticker,
@@ -249,65 +292,72 @@ class ConcurrentBackfillJob:
         finally:
             self.companies_in_progress.discard(ticker)
 
-    async def download_artifacts(self, artifact_ids: List[int]):
+    async def download_one(self, session: Session, artifact_id: int):
         """
-        Download artifacts concurrently.
+        Download a single pending artifact.
 
         Args:
-            artifact_ids: List of artifact IDs to download
+            session: The calling worker's database session
+            artifact_id: ID of the artifact to download
         """
-        semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
-
-        async def download_one(artifact_id: int):
-            async with semaphore:
-                try:
-                    with get_db_session() as session:
-                        artifact = session.query(Artifact).filter_by(id=artifact_id).first()
-                        if not artifact or artifact.status != 'pending_download':
-                            return
-
-                        # Download synchronously but in executor
-                        loop = asyncio.get_event_loop()
-                        success = await loop.run_in_executor(
-                            None,
-                            self.downloader.download_artifact,
-                            session,
-                            artifact
-                        )
-
-                        if success or artifact.status in ('downloaded', 'skipped'):
-                            self.stats['artifacts_downloaded'] += 1
-                        else:
-                            self.stats['artifacts_failed'] += 1
+        try:
+            artifact = session.get(Artifact, artifact_id)
+            if not artifact or artifact.status != 'pending_download':
+                return
+
+            # Download synchronously on the dedicated download pool
+            loop = asyncio.get_running_loop()
+            success = await loop.run_in_executor(
+                self.download_executor,
+                self.downloader.download_artifact,
+                session,
+                artifact
+            )
 
-                except Exception as e:
-                    self.stats['artifacts_failed'] += 1
-                    logger.error("artifact_download_failed", artifact_id=artifact_id, error=str(e))
+            if success or artifact.status in ('downloaded', 'skipped'):
+                self.stats['artifacts_downloaded'] += 1
+            else:
+                self.stats['artifacts_failed'] += 1
 
-        # Download all artifacts concurrently (with semaphore limit)
-        await asyncio.gather(*[download_one(aid) for aid in artifact_ids])
+        except Exception as e:
+            self.stats['artifacts_failed'] += 1
+            logger.error("artifact_download_failed", artifact_id=artifact_id, error=str(e))
 
-    async def process_batch(self, companies: List[dict], run_id: int):
+        finally:
+            # End the transaction on every path (early return, failure, or the
+            # read after download_artifact's commit) so the worker does not sit
+            # idle in transaction on a pooled connection while waiting on the
+            # queue, and a failed transaction does not poison the next artifact
+            session.rollback()
+            # Keep the long-lived session's identity map from growing
+            session.expunge_all()
+
+    async def download_worker(self):
         """
-        Process a batch of companies concurrently.
+        Consume artifact IDs from the download queue until cancelled.
 
-        Args:
-            companies: List of company info dicts
-            run_id: Execution run ID
+        Each worker reuses one session for all its artifacts instead of
+        opening a session per artifact. If that session breaks, the worker
+        starts a fresh one rather than dying, so the queue keeps draining
+        and producers never block on a full queue.
         """
-        semaphore = asyncio.Semaphore(self.max_concurrent_companies)
-
-        async def process_with_semaphore(company_info):
-            async with semaphore:
-                return await self.process_company(company_info, run_id)
-
-        # Process all companies in batch concurrently
-        results = await asyncio.gather(
-            *[process_with_semaphore(c) for c in companies],
-            return_exceptions=True
-        )
-
-        return results
+        while True:
+            try:
+                with get_db_session() as session:
+                    while True:
+                        artifact_id = await self.download_queue.get()
+                        try:
+                            # download_one counts the artifact's outcome itself;
+                            # an exception here means its session cleanup failed
+                            await self.download_one(session, artifact_id)
+                        finally:
+                            self.download_queue.task_done()
+            except Exception as e:
+                logger.error("download_worker_session_reset", error=str(e))
+
+    def stats_snapshot(self) -> dict:
+        """Return stats plus recent errors as a JSON-serializable dict."""
+        return dict(self.stats) | {'errors': list(self.errors)}
 
     def print_progress(self, total_companies: int):
         """Print progress dashboard."""
@@ -336,9 +386,9 @@ class ConcurrentBackfillJob:
         print(f"Downloads:        {self.stats['artifacts_downloaded']:,} success, "
               f"{self.stats['artifacts_failed']:,} failed")
 
-        if self.stats['errors']:
-            print(f"\nRecent Errors ({len(self.stats['errors'])} total):")
-            for err in self.stats['errors'][-5:]:
+        if self.errors:
+            print(f"\nRecent Errors ({self.stats['errors_total']} total):")
+            for err in list(self.errors)[-5:]:
                 print(f"  - {err}")
 
         print("=" * 80)
@@ -348,7 +398,7 @@ class ConcurrentBackfillJob:
         Run backfill job asynchronously.
 
         Args:
-            batch_size: Number of companies per batch
+            batch_size: Number of companies loaded from the database per page
             progress_interval: Seconds between progress updates
         """
         logger.info(
@@ -366,7 +416,7 @@ class ConcurrentBackfillJob:
                 run_type='backfill_concurrent',
                 started_at=datetime.utcnow(),
                 status='running',
-                metadata={
+                meta_data={
                     'start_date': str(self.START_DATE),
                     'end_date': str(self.END_DATE),
                     'max_concurrent_companies': self.max_concurrent_companies,
@@ -378,56 +428,88 @@ class ConcurrentBackfillJob:
             session.commit()
             run_id = run.id
 
+        pending = set()
+        download_workers = []
+        if self.download_as_discover:
+            self.download_queue = asyncio.Queue(maxsize=self.DOWNLOAD_QUEUE_SIZE)
+            download_workers = [
+                asyncio.create_task(self.download_worker())
+                for _ in range(self.max_concurrent_downloads)
+            ]
+
         try:
-            # Get companies without filings (prioritize these)
-            with get_db_session() as session:
-                # Companies without any filings
-                companies_no_filings = session.query(Company).filter(
-                    Company.is_active == True,
-                    Company.exchange.in_(self.exchanges),
-                    ~Company.id.in_(
-                        session.query(Filing.company_id).distinct()
-                    )
-                ).all()
+            has_filings = exists().where(Filing.company_id == Company.id)
 
-                # Companies with filings (check for missing data)
-                companies_with_filings = session.query(Company).filter(
-                    Company.is_active == True,
-                    Company.exchange.in_(self.exchanges),
-                    Company.id.in_(
-                        session.query(Filing.company_id).distinct()
+            # Read the prioritized id list up front (ids only, cheap): companies
+            # without filings first. Details are loaded per page in short
+            # sessions, so no cursor or transaction stays open for the run
+            with get_db_session() as session:
+                id_rows = session.execute(
+                    select(Company.id, has_filings.label('has_filings'))
+                    .where(
+                        Company.is_active == True,
+                        Company.exchange.in_(self.exchanges)
                     )
+                    .order_by(has_filings.asc(), Company.id)
                 ).all()
 
-                # Prioritize: companies without filings first
-                all_companies = companies_no_filings + companies_with_filings
-
-                company_list = [
-                    {'id': c.id, 'ticker': c.ticker, 'cik': c.cik, 'exchange': c.exchange}
-                    for c in all_companies
-                ]
+            company_ids = [row.id for row in id_rows]
+            total_companies = len(company_ids)
+            without_filings = sum(1 for row in id_rows if not row.has_filings)
 
-            total_companies = len(company_list)
             logger.info(
                 "companies_loaded",
                 total=total_companies,
-                without_filings=len(companies_no_filings),
-                with_filings=len(companies_with_filings)
+                without_filings=without_filings,
+                with_filings=total_companies - without_filings
             )
 
-            # Process in batches
+            # A new company starts as soon as any in-flight one finishes, so a
+            # slow company never holds back the rest of a page
             last_progress = time.time()
 
             for i in range(0, total_companies, batch_size):
-                batch = company_list[i:i+batch_size]
+                page_ids = company_ids[i:i + batch_size]
+                with get_db_session() as session:
+                    rows_by_id = {
+                        row.id: row
+                        for row in session.execute(
+                            select(Company.id, Company.ticker, Company.cik, Company.exchange)
+                            .where(Company.id.in_(page_ids))
+                        )
+                    }
+
+                for company_id in page_ids:
+                    row = rows_by_id.get(company_id)
+                    if row is None:
+                        continue
+
+                    if len(pending) >= self.max_concurrent_companies:
+                        _, pending = await asyncio.wait(
+                            pending, return_when=asyncio.FIRST_COMPLETED
+                        )
+
+                        # Print progress
+                        if time.time() - last_progress >= progress_interval:
+                            self.print_progress(total_companies)
+                            last_progress = time.time()
 
-                # Process batch
-                await self.process_batch(batch, run_id)
+                    company_info = {
+                        'id': row.id,
+                        'ticker': row.ticker,
+                        'cik': row.cik,
+                        'exchange': row.exchange
+                    }
+                    pending.add(asyncio.create_task(
+                        self.process_company(company_info, run_id)
+                    ))
 
-                # Print progress
-                if time.time() - last_progress >= progress_interval:
-                    self.print_progress(total_companies)
-                    last_progress = time.time()
+            if pending:
+                await asyncio.wait(pending)
+
+            # Let queued downloads drain before the final report
+            if self.download_queue is not None:
+                await self.download_queue.join()
 
             # Final progress
             self.print_progress(total_companies)
@@ -441,9 +523,9 @@ class ConcurrentBackfillJob:
                 run.filings_discovered = self.stats['filings_discovered']
 
                 # Update metadata by creating new dict (JSONB column requires full replacement)
-                updated_metadata = run.metadata.copy() if run.metadata else {}
-                updated_metadata['stats'] = self.stats
-                run.metadata = updated_metadata
+                updated_metadata = run.meta_data.copy() if run.meta_data else {}
+                updated_metadata['stats'] = self.stats_snapshot()
+                run.meta_data = updated_metadata
                 session.commit()
 
             logger.info(
@@ -463,14 +545,27 @@ class ConcurrentBackfillJob:
                 run.duration_seconds = int((run.completed_at - run.started_at).total_seconds())
 
                 # Update metadata with stats at time of failure
-                updated_metadata = run.metadata.copy() if run.metadata else {}
-                updated_metadata['stats'] = self.stats
-                run.metadata = updated_metadata
+                updated_metadata = run.meta_data.copy() if run.meta_data else {}
+                updated_metadata['stats'] = self.stats_snapshot()
+                run.meta_data = updated_metadata
                 session.commit()
 
             logger.error("concurrent_backfill_failed", error=str(e))
             raise
 
+        finally:
+            # Stop in-flight companies before closing the client and executor
+            # they use (only non-empty if the run failed part-way)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+            for worker in download_workers:
+                worker.cancel()
+            await asyncio.gather(*download_workers, return_exceptions=True)
+            await self.sec_client.aclose()
+            self.download_executor.shutdown(wait=True)
+
     def run(self, batch_size: int = 100, progress_interval: int = 30):
         """Synchronous wrapper for async run."""
         asyncio.run(self.run_async(batch_size, progress_interval))
@@ -497,7 +592,7 @@ def main():
         '--batch-size',
         type=int,
         default=100,
-        help='Companies per batch (default: 100)'
+        help='Companies loaded from the database per page (default: 100)'
     )
     parser.add_argument(
         '--progress-interval',
@@ -515,6 +610,24 @@ def main():
         action='append',
         help='Filter by exchange (can specify multiple)'
     )
+    parser.add_argument(
+        '--sec-cache-dir',
+        default='.sec_cache',
+        help='Cache SEC submissions JSON in this directory so reruns skip '
+             'the network (default: .sec_cache)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always fetch submissions from SEC, ignoring the cache'
+    )
+    parser.add_argument(
+        '--cache-ttl',
+        type=int,
+        default=SECAPIClient.CACHE_TTL,
+        help=f'Seconds a cached submissions response stays fresh '
+             f'(default: {SECAPIClient.CACHE_TTL})'
+    )
 
     args = parser.parse_args()
 
@@ -522,7 +635,9 @@ def main():
         max_concurrent_companies=args.max_concurrent_companies,
         max_concurrent_downloads=args.max_concurrent_downloads,
         download_as_discover=not args.no_download,
-        exchanges=args.exchange if args.exchange else None
+        exchanges=args.exchange if args.exchange else None,
+        sec_cache_dir=None if args.no_cache else args.sec_cache_dir,
+        sec_cache_ttl=args.cache_ttl
     )
 
     job.run(
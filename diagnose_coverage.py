@@ -7,7 +7,7 @@ Compares filesystem folders vs database records to identify coverage gaps.
 import os
 import sys
 from pathlib import Path
-from collections import defaultdict
+from collections import Counter, defaultdict
 from datetime import datetime
 from config.db import engine
 import structlog
@@ -24,6 +24,14 @@ FILING_PATTERNS = {
     'FUND': ['N-CSR', 'N-PORT', 'N-CEN', 'N-Q', 'NPORT-P', 'NPORT-EX']
 }
 
+# Flattened form_type -> pattern lookup, in FILING_PATTERNS priority order
+FORM_TO_PATTERN = {
+    form: pattern
+    for pattern, forms in FILING_PATTERNS.items()
+    for form in forms
+}
+PATTERN_PRIORITY = {pattern: i for i, pattern in enumerate(FILING_PATTERNS)}
+
 
 def get_filesystem_folders(exchange):
     """Get list of company ticker folders from filesystem."""
@@ -98,7 +106,7 @@ def get_db_companies_with_filings(conn, exchange_filter=None, fiscal_years=None)
     fiscal_years = fiscal_years or [2023, 2024, 2025]
 
     query = """
-        SELECT DISTINCT
+        SELECT
             c.id,
             c.ticker,
             c.exchange,
@@ -150,32 +158,97 @@ def classify_company_by_filings(form_types):
     if not form_types:
         return 'NO_FILINGS'
 
-    form_set = set(form_types)
+    # Highest-priority pattern wins (US domestic > foreign private > fund)
+    return min(
+        (FORM_TO_PATTERN[f] for f in form_types if f in FORM_TO_PATTERN),
+        key=PATTERN_PRIORITY.__getitem__,
+        default='OTHER'
+    )
+
+
+def get_db_companies_missing_folders(conn, exchange_list, fs_folders, fiscal_years=None):
+    """Get companies with filings whose ticker has no filesystem folder.
+
+    The anti-join against the filesystem folder names runs in PostgreSQL, so
+    only the missing companies are sent back. A NULL ticker can never have
+    a folder, so it is reported explicitly (``<> ALL`` alone yields NULL).
+    """
+    cur = conn.cursor()
+
+    fiscal_years = fiscal_years or [2023, 2024, 2025]
+
+    cur.execute("""
+        SELECT
+            c.ticker,
+            c.exchange,
+            array_agg(DISTINCT f.form_type ORDER BY f.form_type) as form_types,
+            COUNT(f.id) as filing_count
+        FROM companies c
+        JOIN filings f ON c.id = f.company_id
+        WHERE f.fiscal_year = ANY(%s)
+          AND c.exchange = ANY(%s)
+          AND (c.ticker IS NULL OR c.ticker <> ALL(%s))
+        GROUP BY c.id, c.ticker, c.exchange
+    """, (fiscal_years, list(exchange_list), list(fs_folders)))
+
+    missing_folders = []
+    for ticker, exchange, form_types, filing_count in cur.fetchall():
+        form_types = form_types or []
+        missing_folders.append({
+            'ticker': ticker,
+            'exchange': exchange,
+            'form_types': form_types,
+            'filing_count': filing_count,
+            'pattern': classify_company_by_filings(form_types)
+        })
 
-    # Check for US domestic (10-K/10-Q)
-    if any(f in FILING_PATTERNS['US_DOMESTIC'] for f in form_set):
-        return 'US_DOMESTIC'
+    cur.close()
+    return missing_folders
 
-    # Check for foreign private issuer
-    if any(f in FILING_PATTERNS['FOREIGN_PRIVATE'] for f in form_set):
-        return 'FOREIGN_PRIVATE'
 
-    # Check for fund
-    if any(f in FILING_PATTERNS['FUND'] for f in form_set):
-        return 'FUND'
+def get_db_active_companies_without_filings(conn, exchange_list, fiscal_years=None, limit=30):
+    """Get active companies with no filings in the given fiscal years.
 
-    return 'OTHER'
+    Returns (total, companies) where companies holds at most ``limit`` rows
+    ordered by ticker; the total comes from a window count in the same query.
+    """
+    cur = conn.cursor()
 
+    fiscal_years = fiscal_years or [2023, 2024, 2025]
 
-def get_ticker_to_company_map(companies):
-    """Create ticker -> company_id mapping."""
-    ticker_map = {}
-    for comp_id, comp_data in companies.items():
-        ticker = comp_data['ticker']
-        exchange = comp_data['exchange']
-        key = (ticker, exchange)
-        ticker_map[key] = comp_id
-    return ticker_map
+    cur.execute("""
+        SELECT
+            c.ticker,
+            c.cik,
+            c.company_name,
+            c.exchange,
+            COUNT(*) OVER () as total
+        FROM companies c
+        LEFT JOIN filings f
+            ON f.company_id = c.id
+           AND f.fiscal_year = ANY(%s)
+        WHERE c.is_active
+          AND c.exchange = ANY(%s)
+          AND f.id IS NULL
+        ORDER BY c.ticker
+        LIMIT %s
+    """, (fiscal_years, list(exchange_list), limit))
+
+    rows = cur.fetchall()
+    total = rows[0][4] if rows else 0
+
+    companies = [
+        {
+            'ticker': row[0],
+            'cik': row[1],
+            'company_name': row[2],
+            'exchange': row[3]
+        }
+        for row in rows
+    ]
+
+    cur.close()
+    return total, companies
 
 
 def main():
@@ -216,14 +289,11 @@ def main():
         companies_with_filings = get_db_companies_with_filings(conn, exchange_list)
         print(f"Companies with filings (2023-2025): {len(companies_with_filings)}")
 
-        # Create ticker mappings
-        ticker_to_id = get_ticker_to_company_map(db_companies)
-
         # Classify companies by filing pattern
-        filing_patterns = defaultdict(int)
-        for comp_id, filing_data in companies_with_filings.items():
-            pattern = classify_company_by_filings(filing_data['form_types'])
-            filing_patterns[pattern] += 1
+        filing_patterns = Counter(
+            classify_company_by_filings(filing_data['form_types'])
+            for filing_data in companies_with_filings.values()
+        )
 
         # Count companies with specific form types
         companies_with_10kq = sum(1 for fdata in companies_with_filings.values()
@@ -252,35 +322,14 @@ def main():
         # Find mismatches
 
         # A) Companies in DB with filings but no folder
-        db_tickers_with_filings = {
-            (fdata['ticker'], fdata['exchange'])
-            for fdata in companies_with_filings.values()
-        }
-
-        missing_folders = []
-        for ticker_key in db_tickers_with_filings:
-            ticker = ticker_key[0]
-            if ticker not in fs_folders:
-                comp_id = ticker_to_id.get(ticker_key)
-                if comp_id and comp_id in companies_with_filings:
-                    filing_data = companies_with_filings[comp_id]
-                    missing_folders.append({
-                        'ticker': ticker,
-                        'exchange': ticker_key[1],
-                        'form_types': filing_data['form_types'],
-                        'filing_count': filing_data['filing_count'],
-                        'pattern': classify_company_by_filings(filing_data['form_types'])
-                    })
+        missing_folders = get_db_companies_missing_folders(conn, exchange_list, fs_folders)
 
         # B) Folders on filesystem but no DB record
         db_tickers = {c['ticker'] for c in db_companies.values()}
         orphan_folders = fs_folders - db_tickers
 
         # C) Active companies with no filings
-        companies_no_filings = []
-        for comp_id, comp_data in db_companies.items():
-            if comp_data['is_active'] and comp_id not in companies_with_filings:
-                companies_no_filings.append(comp_data)
+        no_filings_total, companies_no_filings = get_db_active_companies_without_filings(conn, exchange_list)
 
         # Print Report A: DB with filings but missing folders
         print(f"\n{'─'*100}")
@@ -297,11 +346,11 @@ def main():
             for pattern in sorted(by_pattern.keys()):
                 items = by_pattern[pattern]
                 print(f"\n{pattern} ({len(items)} companies):")
-                for item in sorted(items, key=lambda x: x['ticker'])[:20]:
+                for item in sorted(items, key=lambda x: x['ticker'] or '')[:20]:
                     forms = ','.join(item['form_types'][:5])
                     if len(item['form_types']) > 5:
                         forms += ',...'
-                    print(f"  {item['ticker']:8s} ({item['exchange']:15s}) - {item['filing_count']:3d} filings - [{forms}]")
+                    print(f"  {item['ticker'] or '<NULL>':8s} ({item['exchange']:15s}) - {item['filing_count']:3d} filings - [{forms}]")
                 if len(items) > 20:
                     print(f"  ... and {len(items) - 20} more")
         else:
@@ -325,13 +374,13 @@ def main():
         print(f"\n{'─'*100}")
         print(f"REPORT C: Active DB companies with NO filings (2023-2025)")
         print(f"{'─'*100}")
-        print(f"Total: {len(companies_no_filings)} companies\n")
+        print(f"Total: {no_filings_total} companies\n")
 
         if companies_no_filings:
-            for comp in sorted(companies_no_filings, key=lambda x: x['ticker'])[:30]:
+            for comp in companies_no_filings:
                 print(f"  {comp['ticker']:8s} (CIK: {comp['cik']}) - {comp['company_name'][:60]:60s} ({comp['exchange']})")
-            if len(companies_no_filings) > 30:
-                print(f"  ... and {len(companies_no_filings) - 30} more")
+            if no_filings_total > 30:
+                print(f"  ... and {no_filings_total - 30} more")
         else:
             print("✓ All active companies have filings!")
 
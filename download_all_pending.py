@@ -5,36 +5,90 @@ Downloads all pending artifacts across all exchanges with concurrent workers.
 """
 import sys
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 import structlog
+from sqlalchemy import func
 
 from config.db import get_db_session
 from config.settings import settings
 from models import Artifact
+from services.download_results import (
+    RESULT_COLUMNS, copy_download_results, flush_download_results
+)
 from services.downloader import ArtifactDownloader
 
 logger = structlog.get_logger()
 
+# Number of completed downloads persisted per UPDATE/commit
+RESULT_BATCH_SIZE = 200
 
-def download_all_pending(workers: int = 8):
+# Batch size when results are persisted via COPY into a staging table
+COPY_BATCH_SIZE = 10_000
+
+# Number of pending artifact IDs fetched per query
+ID_PAGE_SIZE = 10_000
+
+def iter_pending_artifact_ids(max_id: int, page_size: int = ID_PAGE_SIZE):
+    """
+    Yield pending artifact IDs up to max_id in ascending order.
+
+    IDs are read in keyset-paginated pages, each in a short-lived session, so
+    neither the full ID list nor a long-running transaction is held.
+
+    Args:
+        max_id: Highest artifact ID to include (snapshot taken at start)
+        page_size: Number of IDs fetched per query
+    """
+    last_id = 0
+
+    while True:
+        with get_db_session() as session:
+            page = [
+                artifact_id
+                for (artifact_id,) in session.query(Artifact.id).filter(
+                    Artifact.status == 'pending_download',
+                    Artifact.id > last_id,
+                    Artifact.id <= max_id
+                ).order_by(Artifact.id).limit(page_size)
+            ]
+
+        yield from page
+
+        if len(page) < page_size:
+            return
+        last_id = page[-1]
+
+
+def download_all_pending(workers: int = 8, copy_results: bool = False):
     """
     Download all pending artifacts across all exchanges.
 
     Args:
         workers: Number of concurrent download workers
+        copy_results: Persist results via COPY into a staging table in
+            batches of COPY_BATCH_SIZE instead of batched UPDATEs
     """
-    logger.info("universal_download_started", phase="download", workers=workers)
+    logger.info(
+        "universal_download_started",
+        phase="download",
+        workers=workers,
+        copy_results=copy_results
+    )
+
+    if copy_results:
+        persist_results, batch_size = copy_download_results, COPY_BATCH_SIZE
+    else:
+        persist_results, batch_size = flush_download_results, RESULT_BATCH_SIZE
 
-    # Get artifact IDs (not full objects) from main session
+    # Count pending artifacts up front; IDs are streamed in pages later
     with get_db_session() as session:
-        artifact_ids = session.query(Artifact.id).filter(
+        total, max_id = session.query(
+            func.count(Artifact.id),
+            func.max(Artifact.id)
+        ).filter(
             Artifact.status == 'pending_download'
-        ).order_by(Artifact.id).all()
-
-        # Extract IDs from tuples
-        artifact_ids = [aid[0] for aid in artifact_ids]
-        total = len(artifact_ids)
+        ).one()
 
     logger.info("pending_artifacts_found", total=total, workers=workers)
 
@@ -48,6 +102,11 @@ def download_all_pending(workers: int = 8):
         Download a single artifact with its own database session.
 
         CRITICAL: Each thread creates its own session for thread safety.
+
+        The artifact row itself is not written here: its new column values
+        are returned so the main thread can persist them in batches. Image
+        artifacts and error logs created along the way are committed by the
+        thread's session as usual.
         """
         try:
             # Create independent session for this thread
@@ -57,14 +116,20 @@ def download_all_pending(workers: int = 8):
 
                 if not artifact:
                     logger.warning("artifact_not_found", artifact_id=artifact_id)
-                    return (artifact_id, False, "not_found")
+                    return (artifact_id, False, "not_found", None)
 
                 # Download using this thread's session
                 downloader = ArtifactDownloader()
-                success = downloader.download_artifact(thread_session, artifact)
+                success = downloader.download_artifact(thread_session, artifact, commit=False)
 
-                status = artifact.status if artifact else "unknown"
-                return (artifact_id, success, status)
+                row = {'id': artifact.id}
+                for column in RESULT_COLUMNS:
+                    row[column] = getattr(artifact, column)
+
+                # Leave the artifact row to the batched UPDATE
+                thread_session.expunge(artifact)
+
+                return (artifact_id, success, row['status'], row)
 
         except Exception as e:
             logger.error(
@@ -73,7 +138,7 @@ def download_all_pending(workers: int = 8):
                 error=str(e),
                 exc_info=False
             )
-            return (artifact_id, False, str(e))
+            return (artifact_id, False, str(e), None)
 
     # Execute downloads with bounded concurrency
     logger.info(
@@ -83,36 +148,53 @@ def download_all_pending(workers: int = 8):
         estimated_duration_minutes=(total / (10 * workers / 1.7))
     )
 
-    results = []
     completed = 0
+    succeeded = 0
+    pending_rows = []
+    max_in_flight = workers * 4
+
+    def handle(future):
+        """Record one finished download and flush results in batches."""
+        nonlocal completed, succeeded, pending_rows
+
+        _, success, _, row = future.result()
+        completed += 1
+        if success:
+            succeeded += 1
+        if row is not None:
+            pending_rows.append(row)
+
+        if len(pending_rows) >= batch_size:
+            persist_results(pending_rows)
+            pending_rows = []
+
+        # Log progress periodically
+        if completed % 100 == 0 or completed == 1:
+            logger.info(
+                "download_progress",
+                progress=f"{completed}/{total}",
+                percentage=f"{(completed/total*100):.1f}%",
+                succeeded=succeeded,
+                failed=completed - succeeded
+            )
 
     with ThreadPoolExecutor(max_workers=workers) as executor:
-        # Submit all tasks and process as they complete
-        future_to_id = {
-            executor.submit(download_one, aid): aid
-            for aid in artifact_ids
-        }
-
-        for future in as_completed(future_to_id):
-            result = future.result()
-            results.append(result)
-            completed += 1
-
-            # Log progress periodically
-            if completed % 100 == 0 or completed == 1:
-                succeeded = sum(1 for _, success, _ in results if success)
-                failed = completed - succeeded
-                logger.info(
-                    "download_progress",
-                    progress=f"{completed}/{total}",
-                    percentage=f"{(completed/total*100):.1f}%",
-                    succeeded=succeeded,
-                    failed=failed
-                )
-
-    # Aggregate final results
-    succeeded = sum(1 for _, success, _ in results if success)
-    failed = total - succeeded
+        # Keep at most max_in_flight futures alive while streaming IDs
+        in_flight = set()
+
+        for aid in iter_pending_artifact_ids(max_id):
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    handle(future)
+            in_flight.add(executor.submit(download_one, aid))
+
+        for future in wait(in_flight).done:
+            handle(future)
+
+    persist_results(pending_rows)
+
+    failed = completed - succeeded
 
     # Final summary
     logger.info(
@@ -140,13 +222,21 @@ def main():
         default=8,
         help='Number of concurrent download workers (default: 8)'
     )
+    parser.add_argument(
+        '--copy-results',
+        action='store_true',
+        help=f'Persist results via COPY into a staging table every {COPY_BATCH_SIZE} downloads (for very large runs)'
+    )
 
     args = parser.parse_args()
 
     try:
         start_time = datetime.now()
 
-        succeeded, failed = download_all_pending(workers=args.workers)
+        succeeded, failed = download_all_pending(
+            workers=args.workers,
+            copy_results=args.copy_results
+        )
 
         duration = (datetime.now() - start_time).total_seconds()
         logger.info(
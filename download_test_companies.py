@@ -4,121 +4,198 @@ Targeted download script for test companies.
 Downloads pending artifacts for specific companies only.
 """
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import func
 from config.db import get_db_session
 from models import Company, Filing, Artifact
 from services.downloader import ArtifactDownloader
+from services.download_results import RESULT_COLUMNS, flush_download_results
 import structlog
 
 logger = structlog.get_logger()
 
 # Test companies
-TEST_TICKERS = ['DHR', 'GILD', 'HON', 'KLAC', 'LOW']
+TEST_TICKERS: frozenset[str] = frozenset({'DHR', 'GILD', 'HON', 'KLAC', 'LOW'})
+
+# Concurrent download workers (kept low to stay well under SEC rate limits)
+MAX_WORKERS = 3
+
+# Extra attempts for an artifact rejected with HTTP 429
+RATE_LIMIT_RETRIES = 3
+
+# Emit a progress heartbeat every N completed artifacts
+PROGRESS_EVERY = 10
+
+# Number of finished artifacts whose results are committed together
+COMMIT_EVERY = 20
+
+
+def download_one(downloader, item):
+    """
+    Download a single artifact in its own database session.
+
+    Sessions are not thread-safe, so each worker opens its own. Downloads
+    rejected with HTTP 429 are retried with exponential backoff by the
+    downloader before the failure is recorded.
+
+    The artifact row itself is not written here: its new column values are
+    returned so the main thread can commit them in batches.
+
+    Args:
+        downloader: Shared ArtifactDownloader
+        item: (artifact_id, ticker, form_type, artifact_type, filename)
+
+    Returns:
+        (success, row) where row holds 'id' plus RESULT_COLUMNS values
+    """
+    artifact_id = item[0]
+
+    with get_db_session() as session:
+        artifact = session.get(Artifact, artifact_id)
+        success = downloader.download_artifact(
+            session,
+            artifact,
+            commit=False,
+            rate_limit_retries=RATE_LIMIT_RETRIES
+        )
+
+        row = {'id': artifact.id}
+        for column in RESULT_COLUMNS:
+            row[column] = getattr(artifact, column)
+
+        # Leave the artifact row to the batched UPDATE
+        session.expunge(artifact)
+
+    return success, row
+
 
 def main():
     """Download artifacts for test companies only."""
-    logger.info("starting_targeted_download", tickers=TEST_TICKERS)
+    tickers = sorted(TEST_TICKERS)
+    logger.info("starting_targeted_download", tickers=tickers)
+
+    if not tickers:
+        logger.info("no_test_tickers_configured")
+        return
 
     downloader = ArtifactDownloader()
 
     with get_db_session() as session:
         # Get all pending artifacts for test companies
-        artifacts = session.query(Artifact).join(
-            Filing, Artifact.filing_id == Filing.id
+        # Select only the columns the workers need; no ORM objects are built
+        work = session.query(
+            Artifact.id,
+            Company.ticker,
+            Filing.form_type,
+            Artifact.artifact_type,
+            Artifact.filename
         ).join(
-            Company, Filing.company_id == Company.id
+            Artifact.filing
+        ).join(
+            Filing.company
         ).filter(
-            Company.ticker.in_(TEST_TICKERS),
+            Company.ticker.in_(tickers),
             Artifact.status == 'pending_download'
         ).order_by(
             Company.ticker, Filing.filing_date.desc()
         ).all()
 
-        total = len(artifacts)
-        logger.info("artifacts_found", total=total, tickers=TEST_TICKERS)
+    total = len(work)
+    logger.info("artifacts_found", total=total, tickers=tickers)
 
-        if total == 0:
-            logger.info("no_artifacts_to_download")
-            return
+    if total == 0:
+        logger.info("no_artifacts_to_download")
+        return
 
-        # Download each artifact
-        succeeded = 0
-        failed = 0
+    # Download artifacts concurrently, one session per worker
+    succeeded = 0
+    failed = 0
+    pending_rows = []
 
-        for i, artifact in enumerate(artifacts, 1):
-            filing = artifact.filing
-            company = filing.company
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        future_to_item = {
+            executor.submit(download_one, downloader, item): item
+            for item in work
+        }
 
-            logger.info(
-                "downloading_artifact",
-                progress=f"{i}/{total}",
-                ticker=company.ticker,
-                form_type=filing.form_type,
-                artifact_type=artifact.artifact_type,
-                filename=artifact.filename
-            )
+        for i, future in enumerate(as_completed(future_to_item), 1):
+            _, ticker, _, _, filename = future_to_item[future]
 
             try:
-                success = downloader.download_artifact(session, artifact)
+                success, row = future.result()
+                pending_rows.append(row)
                 if success:
                     succeeded += 1
-                    logger.info(
-                        "artifact_downloaded",
-                        progress=f"{i}/{total}",
-                        ticker=company.ticker,
-                        filename=artifact.filename,
-                        status="success"
-                    )
                 else:
                     failed += 1
                     logger.warning(
                         "artifact_download_failed",
-                        progress=f"{i}/{total}",
-                        ticker=company.ticker,
-                        filename=artifact.filename
+                        done=i,
+                        total=total,
+                        ticker=ticker,
+                        filename=filename
                     )
             except Exception as e:
                 failed += 1
                 logger.error(
                     "artifact_download_error",
-                    progress=f"{i}/{total}",
-                    ticker=company.ticker,
+                    done=i,
+                    total=total,
+                    ticker=ticker,
                     error=str(e)
                 )
 
-        # Final summary
-        logger.info(
-            "targeted_download_completed",
-            total=total,
-            succeeded=succeeded,
-            failed=failed,
-            success_rate=f"{(succeeded/total*100):.1f}%" if total > 0 else "0%"
-        )
-
-        # Show summary by company
-        for ticker in TEST_TICKERS:
-            company = session.query(Company).filter(Company.ticker == ticker).first()
-            if company:
-                downloaded_count = session.query(Artifact).join(
-                    Filing
-                ).filter(
-                    Filing.company_id == company.id,
-                    Artifact.status == 'downloaded'
-                ).count()
-
-                pending_count = session.query(Artifact).join(
-                    Filing
-                ).filter(
-                    Filing.company_id == company.id,
-                    Artifact.status == 'pending_download'
-                ).count()
+            if len(pending_rows) >= COMMIT_EVERY:
+                flush_download_results(pending_rows)
+                pending_rows = []
 
+            # Failures are logged per item above; successes only via the heartbeat
+            if i % PROGRESS_EVERY == 0 or i == total:
                 logger.info(
-                    "company_summary",
-                    ticker=ticker,
-                    downloaded=downloaded_count,
-                    pending=pending_count
+                    "downloading_batch_progress",
+                    done=i,
+                    total=total,
+                    succeeded=succeeded,
+                    failed=failed
                 )
 
+    flush_download_results(pending_rows)
+
+    # Final summary
+    logger.info(
+        "targeted_download_completed",
+        total=total,
+        succeeded=succeeded,
+        failed=failed,
+        success_rate=f"{(succeeded/total*100):.1f}%" if total > 0 else "0%"
+    )
+
+    with get_db_session() as session:
+        # Show summary by company (one grouped query with COUNT ... FILTER for all tickers)
+        company_counts = session.query(
+            Company.ticker,
+            func.count(Artifact.id).filter(Artifact.status == 'downloaded').label('downloaded'),
+            func.count(Artifact.id).filter(Artifact.status == 'pending_download').label('pending')
+        ).outerjoin(
+            Filing, Filing.company_id == Company.id
+        ).outerjoin(
+            Artifact, Artifact.filing_id == Filing.id
+        ).filter(
+            Company.ticker.in_(tickers)
+        ).group_by(
+            Company.ticker
+        ).order_by(
+            Company.ticker
+        ).all()
+
+        for ticker, downloaded_count, pending_count in company_counts:
+            logger.info(
+                "company_summary",
+                ticker=ticker,
+                downloaded=downloaded_count,
+                pending=pending_count
+            )
+
 if __name__ == '__main__':
     try:
         main()
@@ -9,15 +9,49 @@
   python export_companies.py --output-dir ./output    # 指定输出目录
 """
 import argparse
-import csv
 import os
 from pathlib import Path
-from sqlalchemy import create_engine, text
-from config.settings import settings
+from sqlalchemy import text
+from config.db import engine
 import structlog
 
 logger = structlog.get_logger()
 
+# CSV写入缓冲区大小（1 MiB），减少逐块写入产生的小块系统调用
+CSV_BUFFER_SIZE = 1 << 20
+
+# CSV表头（含UTF-8 BOM）预先编码一次，每个文件直接写入字节
+# 行尾使用 \n，与 PostgreSQL COPY CSV 输出一致
+CSV_HEADER = ('股票代码', '公司名称', '上市时间')
+CSV_HEADER_BYTES = ('\ufeff' + ','.join(CSV_HEADER) + '\n').encode('utf-8')
+
+# 需要导出的交易所列表；exchange 为 NULL 时返回所有交易所
+# 模块级预构建，避免每次调用重新拼接SQL字符串
+EXCHANGES_QUERY = text("""
+SELECT DISTINCT exchange
+FROM companies
+WHERE is_active = true
+  AND (CAST(:exchange AS VARCHAR) IS NULL OR exchange = :exchange)
+ORDER BY exchange
+""")
+
+# 单个交易所的导出语句：由 PostgreSQL 在服务端完成CSV序列化，字节流直接写入文件
+# 上市时间取最早的filing_date近似，相关子查询按 (company_id, filing_date) 索引逐公司取 MIN
+EXPORT_COPY_SQL = """
+COPY (
+    SELECT
+        c.ticker,
+        c.company_name,
+        COALESCE(TO_CHAR(
+            (SELECT MIN(f.filing_date) FROM filings f WHERE f.company_id = c.id),
+            'YYYY-MM-DD'
+        ), 'N/A')
+    FROM companies c
+    WHERE c.is_active = true AND c.exchange = %s
+    ORDER BY c.ticker
+) TO STDOUT WITH (FORMAT csv)
+"""
+
 
 def export_companies_to_csv(exchange_filter=None, output_base_dir='data/companies'):
     """
@@ -27,81 +61,46 @@ def export_companies_to_csv(exchange_filter=None, output_base_dir='data/companie
         exchange_filter: 指定交易所，None表示导出所有
         output_base_dir: 输出基础目录
     """
-    engine = create_engine(settings.database_url)
-    
     # 确保输出目录存在
     Path(output_base_dir).mkdir(parents=True, exist_ok=True)
     
     with engine.connect() as conn:
-        # 查询公司信息，包含最早的filing_date作为上市时间近似值
-        query = """
-        SELECT 
-            c.ticker AS 股票代码,
-            c.company_name AS 公司名称,
-            c.exchange AS 交易所,
-            MIN(f.filing_date) AS 上市时间
-        FROM companies c
-        LEFT JOIN filings f ON c.id = f.company_id
-        WHERE c.is_active = true
-        """
+        # 先取出需要导出的交易所列表
+        exchanges = conn.execute(EXCHANGES_QUERY, {'exchange': exchange_filter or None}).scalars().all()
         
-        params = {}
-        if exchange_filter:
-            query += " AND c.exchange = :exchange"
-            params['exchange'] = exchange_filter
-        
-        query += """
-        GROUP BY c.ticker, c.company_name, c.exchange
-        ORDER BY c.exchange, c.ticker
-        """
-        
-        result = conn.execute(text(query), params)
-        rows = result.fetchall()
-        
-        if not rows:
+        if not exchanges:
             logger.warning("no_companies_found", exchange=exchange_filter)
             print(f"未找到任何公司记录")
             return
         
-        # 按交易所分组
-        companies_by_exchange = {}
-        for row in rows:
-            ticker, company_name, exchange, listing_date = row
-            if exchange not in companies_by_exchange:
-                companies_by_exchange[exchange] = []
-            
-            companies_by_exchange[exchange].append({
-                '股票代码': ticker,
-                '公司名称': company_name,
-                '上市时间': str(listing_date) if listing_date else 'N/A'
-            })
+        # 每个交易所一次 COPY ... TO STDOUT，绕过逐行构建结果对象和Python csv模块
+        dbapi_conn = conn.connection
+        exported_by_exchange = {}
         
-        # 为每个交易所创建CSV文件
-        total_exported = 0
-        for exchange, companies in companies_by_exchange.items():
-            # 创建交易所目录
+        for exchange in exchanges:
             exchange_dir = os.path.join(output_base_dir, exchange)
             Path(exchange_dir).mkdir(parents=True, exist_ok=True)
-            
-            # 写入CSV文件
             csv_path = os.path.join(exchange_dir, 'company.csv')
-            with open(csv_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                fieldnames = ['股票代码', '公司名称', '上市时间']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                writer.writerows(companies)
             
+            with dbapi_conn.cursor() as cur, open(csv_path, 'wb', buffering=CSV_BUFFER_SIZE) as csvfile:
+                csvfile.write(CSV_HEADER_BYTES)
+                with cur.copy(EXPORT_COPY_SQL, (exchange,)) as copy:
+                    for data in copy:
+                        csvfile.write(data)
+                # COPY 完成后 rowcount 为导出的行数
+                count = cur.rowcount
+            
+            exported_by_exchange[exchange] = count
             logger.info(
                 "export_completed",
                 exchange=exchange,
-                count=len(companies),
+                count=count,
                 path=csv_path
             )
-            print(f"✓ {exchange}: 导出 {len(companies)} 家公司 -> {csv_path}")
-            total_exported += len(companies)
+            print(f"✓ {exchange}: 导出 {count} 家公司 -> {csv_path}")
         
-        print(f"\n总计导出 {total_exported} 家公司到 {len(companies_by_exchange)} 个交易所")
+        total_exported = sum(exported_by_exchange.values())
+        print(f"\n总计导出 {total_exported} 家公司到 {len(exported_by_exchange)} 个交易所")
 
 
 def main():
@@ -6,21 +6,167 @@ Professional report generation with detailed analysis
 import os
 import sys
 from pathlib import Path
+from array import array
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from itertools import islice, repeat
+from typing import Dict, List, TextIO
 
-from sqlalchemy import create_engine, text
-from config.settings import settings
+
+# 默认检查范围：交易所与财年（范围外的目录在扫描时直接跳过）
+SCAN_EXCHANGES = ('NASDAQ', 'NYSE')
+SCAN_YEARS = range(2023, 2026)
+
+# 数据库记录每批取回的行数
+DB_FETCH_SIZE = 10000
+
+# 参与完整性比对的数据库记录（已下载或跳过且有本地路径）
+DB_RECORD_FILTER = "a.status IN ('downloaded', 'skipped') AND a.local_path IS NOT NULL"
+
+# 报告文件写入缓冲区大小（1 MiB）
+REPORT_BUFFER_SIZE = 1 << 20
+
+# 文件大小单位（按 1024 进位）
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+# 报告表格行模板（预先定义，循环中只做 str.format）
+EXCHANGE_ROW = "| {} | {:,} | {} | {:,} | {:.1f}% |"
+FILE_TYPE_ROW = "| {} | {:,} | {} | {:.1f}% | {:.1f}% |"
+YEAR_ROW = "| {} | {:,} | {} | {:.1f}% |"
+MATCH_ROW = "| {} | {:,} | {:,} | {:,} | {:.2f}% |"
+COMPANY_ROW = "| {} | `{}` | {:,} |"
+
+# 文件扩展名 -> 文件类型（xbrl 目录下的文件另行归类）
+EXT_TO_TYPE = {
+    '.html': 'html',
+    '.htm': 'html',
+    '.png': 'image',
+    '.jpg': 'image',
+    '.jpeg': 'image',
+    '.gif': 'image',
+}
+
+
+def _scan_dirs(path):
+    """列出目录下的子目录（os.DirEntry）"""
+    with os.scandir(path) as it:
+        return [entry for entry in it if entry.is_dir(follow_symlinks=False)]
+
+
+def _walk_files(path, dir_name):
+    """递归遍历目录，逐个返回 (所在目录名, 非隐藏文件的 os.DirEntry)"""
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk_files(entry.path, entry.name)
+            elif entry.is_file(follow_symlinks=False) and entry.name[0] != '.':
+                yield dir_name, entry
+
+
+def _scan_exchange(storage_root: str, exchange: str, years: frozenset) -> Dict:
+    """
+    扫描单个交易所目录（在子进程中执行）
+    
+    目录层级：交易所/公司代码/年份/...，不在 years 中的年份目录不进入
+    years 为 None 时扫描所有年份
+    只返回字符串、整数和普通dict，避免向父进程回传 Path 对象；
+    路径以 list 返回（文件系统路径本身唯一），序列化开销低于 set，由父进程建集合
+    """
+    paths_by_type = defaultdict(list)
+    # 文件大小按类型收集到无符号64位数组中，扫描结束后一次性求和
+    type_sizes = defaultdict(lambda: array('Q'))
+    by_year = defaultdict(lambda: {'count': 0, 'size': 0})
+    by_company = defaultdict(int)
+    
+    # entry.path 均以 storage_root/ 开头，切片即得相对路径，无需 Path 解析
+    root_prefix_len = len(os.path.join(storage_root, ''))
+    ext_to_type = EXT_TO_TYPE.get
+    
+    for company_entry in _scan_dirs(os.path.join(storage_root, exchange)):
+        ticker = company_entry.name
+        company_count = 0
+        
+        for year_entry in _scan_dirs(company_entry.path):
+            try:
+                year = int(year_entry.name)
+            except ValueError:
+                continue
+            
+            if years is not None and year not in years:
+                continue
+            
+            # 年份/公司计数和路径在局部变量中累加，目录结束后写回一次
+            year_sizes = array('Q')
+            year_paths = defaultdict(list)
+            
+            for dir_name, entry in _walk_files(year_entry.path, year_entry.name):
+                try:
+                    file_size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+                
+                if dir_name == 'xbrl':
+                    file_type = 'xbrl'
+                else:
+                    name = entry.name
+                    dot = name.rfind('.')
+                    file_type = ext_to_type(name[dot:].lower(), 'other') if dot >= 0 else 'other'
+                
+                year_paths[file_type].append(entry.path[root_prefix_len:])
+                
+                type_sizes[file_type].append(file_size)
+                year_sizes.append(file_size)
+            
+            for file_type, batch in year_paths.items():
+                paths_by_type[file_type].extend(batch)
+            
+            if year_sizes:
+                year_stats = by_year[year]
+                year_stats['count'] += len(year_sizes)
+                year_stats['size'] += sum(year_sizes)
+                company_count += len(year_sizes)
+        
+        if company_count:
+            by_company[f"{exchange}/{ticker}"] += company_count
+    
+    return {
+        'paths_by_type': dict(paths_by_type),
+        'by_type': {
+            file_type: {'count': len(sizes), 'size': sum(sizes)}
+            for file_type, sizes in type_sizes.items()
+        },
+        'by_year': dict(by_year),
+        'by_company': dict(by_company)
+    }
+
+
+def _count_common(a: set, b: set) -> int:
+    """两个集合的交集大小（遍历较小的集合，不构建交集）"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(1 for item in a if item in b)
 
 
 class IntegrityReportExporter:
     """完整性报告导出器"""
     
-    def __init__(self):
+    def __init__(self, exchanges=SCAN_EXCHANGES, years=SCAN_YEARS):
+        """
+        Args:
+            exchanges: 检查的交易所，None表示全部
+            years: 检查的财年，None表示全部
+        """
+        # 配置与 SQLAlchemy 延迟导入，--help 等短流程无需承担导入开销
+        from config.settings import settings
+        
         self.storage_root = Path(settings.storage_root)
-        self.engine = create_engine(settings.database_url)
-        self.report_lines = []
+        self.database_url = settings.database_url
+        self._engine = None
+        
+        # 检查范围
+        self.exchanges = tuple(exchanges) if exchanges is not None else None
+        self.years = frozenset(years) if years is not None else None
         
         # 统计数据
         self.file_stats = {
@@ -40,17 +186,21 @@ class IntegrityReportExporter:
             'by_status': defaultdict(int)
         }
     
-    def add_line(self, line: str = ""):
-        """添加一行到报告"""
-        self.report_lines.append(line)
+    @property
+    def engine(self):
+        """数据库引擎（首次查询数据库时创建）"""
+        if self._engine is None:
+            from sqlalchemy import create_engine
+            self._engine = create_engine(self.database_url)
+        return self._engine
     
     def format_size(self, size_bytes: int) -> str:
         """格式化文件大小"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size_bytes < 1024.0:
-                return f"{size_bytes:.2f} {unit}"
-            size_bytes /= 1024.0
-        return f"{size_bytes:.2f} PB"
+        if size_bytes <= 0:
+            return "0.00 B"
+        # 由 bit_length 直接得到单位级别（每级 2^10），无需逐级循环除法
+        magnitude = min(len(SIZE_UNITS) - 1, (size_bytes.bit_length() - 1) // 10)
+        return f"{size_bytes / (1 << (10 * magnitude)):.2f} {SIZE_UNITS[magnitude]}"
     
     def scan_filesystem(self) -> Dict:
         """扫描文件系统"""
@@ -58,81 +208,65 @@ class IntegrityReportExporter:
         
         if not self.storage_root.exists():
             print(f"⚠️  存储目录不存在: {self.storage_root}")
-            return {'files': [], 'file_paths': set(), 'file_paths_by_type': defaultdict(set), 'file_paths_by_exchange_type': defaultdict(lambda: defaultdict(set))}
+            return {'file_paths': set(), 'file_paths_by_type': defaultdict(set), 'file_paths_by_exchange_type': defaultdict(lambda: defaultdict(set))}
         
-        all_files = []
         file_paths_set = set()
         file_paths_by_type = defaultdict(set)  # 按类型分组的路径
         file_paths_by_exchange_type = defaultdict(lambda: defaultdict(set))  # 按交易所和类型分组
         
-        for exchange_dir in self.storage_root.iterdir():
-            if not exchange_dir.is_dir():
-                continue
-            
-            exchange = exchange_dir.name
-            
-            for company_dir in exchange_dir.iterdir():
-                if not company_dir.is_dir():
-                    continue
+        # 每个交易所目录在独立进程中扫描，父进程合并结果
+        # 范围外的交易所目录直接跳过，不进入子目录
+        exchanges = [
+            entry.name for entry in _scan_dirs(self.storage_root)
+            if self.exchanges is None or entry.name in self.exchanges
+        ]
+        
+        if exchanges:
+            max_workers = min(len(exchanges), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(
+                    _scan_exchange, repeat(str(self.storage_root)), exchanges, repeat(self.years)
+                )
                 
-                ticker = company_dir.name
+                # 循环内使用局部变量，避免每次经由 self 查找属性
+                stats_all = self.file_stats
+                ex_all = stats_all['by_exchange']
+                type_all = stats_all['by_type']
+                year_all = stats_all['by_year']
+                company_all = stats_all['by_company']
                 
-                for year_dir in company_dir.iterdir():
-                    if not year_dir.is_dir():
+                for exchange, result in zip(exchanges, results):
+                    # 没有文件的交易所不出现在统计中
+                    if not result['by_type']:
                         continue
                     
-                    try:
-                        year = int(year_dir.name)
-                    except ValueError:
-                        continue
+                    ex_paths = file_paths_by_exchange_type[exchange]
+                    for file_type, paths in result['paths_by_type'].items():
+                        file_paths_set.update(paths)
+                        file_paths_by_type[file_type].update(paths)
+                        ex_paths[file_type].update(paths)
+                    
+                    ex_stats = ex_all[exchange]
+                    for file_type, stats in result['by_type'].items():
+                        count, size = stats['count'], stats['size']
+                        stats_all['total_files'] += count
+                        stats_all['total_size'] += size
+                        ex_stats['count'] += count
+                        ex_stats['size'] += size
+                        type_stats = type_all[file_type]
+                        type_stats['count'] += count
+                        type_stats['size'] += size
+                    
+                    for year, stats in result['by_year'].items():
+                        year_stats = year_all[year]
+                        year_stats['count'] += stats['count']
+                        year_stats['size'] += stats['size']
                     
-                    for file_path in year_dir.rglob('*'):
-                        if file_path.is_file() and not file_path.name.startswith('.'):
-                            try:
-                                file_size = file_path.stat().st_size
-                                
-                                if file_path.parent.name == 'xbrl':
-                                    file_type = 'xbrl'
-                                elif file_path.suffix.lower() in ['.html', '.htm']:
-                                    file_type = 'html'
-                                elif file_path.suffix.lower() in ['.png', '.jpg', '.jpeg', '.gif']:
-                                    file_type = 'image'
-                                else:
-                                    file_type = 'other'
-                                
-                                file_info = {
-                                    'path': file_path,
-                                    'relative_path': file_path.relative_to(self.storage_root),
-                                    'exchange': exchange,
-                                    'ticker': ticker,
-                                    'year': year,
-                                    'type': file_type,
-                                    'size': file_size,
-                                    'name': file_path.name
-                                }
-                                
-                                all_files.append(file_info)
-                                relative_path = str(file_path.relative_to(self.storage_root))
-                                file_paths_set.add(relative_path)
-                                file_paths_by_type[file_type].add(relative_path)
-                                file_paths_by_exchange_type[exchange][file_type].add(relative_path)
-                                
-                                self.file_stats['total_files'] += 1
-                                self.file_stats['total_size'] += file_size
-                                self.file_stats['by_exchange'][exchange]['count'] += 1
-                                self.file_stats['by_exchange'][exchange]['size'] += file_size
-                                self.file_stats['by_type'][file_type]['count'] += 1
-                                self.file_stats['by_type'][file_type]['size'] += file_size
-                                self.file_stats['by_year'][year]['count'] += 1
-                                self.file_stats['by_year'][year]['size'] += file_size
-                                self.file_stats['by_company'][f"{exchange}/{ticker}"] += 1
-                                
-                            except Exception as e:
-                                pass
-        
-        print(f"✅ 找到 {len(all_files)} 个文件")
+                    for company, count in result['by_company'].items():
+                        company_all[company] += count
+        
+        print(f"✅ 找到 {self.file_stats['total_files']} 个文件")
         return {
-            'files': all_files,
             'file_paths': file_paths_set,
             'file_paths_by_type': file_paths_by_type,
             'file_paths_by_exchange_type': file_paths_by_exchange_type
@@ -142,90 +276,112 @@ class IntegrityReportExporter:
         """查询数据库记录"""
         print("🗄️  查询数据库...")
         
-        with self.engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT 
-                    a.id,
-                    a.local_path,
-                    a.artifact_type,
-                    a.status,
-                    a.file_size,
-                    c.exchange,
-                    c.ticker,
-                    f.fiscal_year
-                FROM artifacts a
-                JOIN filings f ON a.filing_id = f.id
-                JOIN companies c ON f.company_id = c.id
-                WHERE a.status IN ('downloaded', 'skipped')
-                  AND a.local_path IS NOT NULL;
-            """))
-            
-            db_files = []
-            db_paths_set = set()
-            db_paths_by_type = defaultdict(set)  # 按类型分组的路径
-            db_paths_by_exchange_type = defaultdict(lambda: defaultdict(set))  # 按交易所和类型分组
-            
-            for row in result:
-                artifact_id, local_path, artifact_type, status, file_size, exchange, ticker, year = row
-                
-                db_files.append({
-                    'id': artifact_id,
-                    'local_path': local_path,
-                    'type': artifact_type,
-                    'status': status,
-                    'size': file_size,
-                    'exchange': exchange,
-                    'ticker': ticker,
-                    'year': year
-                })
-                
-                if local_path:
-                    db_paths_set.add(local_path)
-                    db_paths_by_type[artifact_type].add(local_path)
-                    db_paths_by_exchange_type[exchange][artifact_type].add(local_path)
+        db_paths_set = set()
+        db_paths_by_type = defaultdict(set)  # 按类型分组的路径
+        db_paths_by_exchange_type = defaultdict(lambda: defaultdict(set))  # 按交易所和类型分组
+        
+        # 与文件系统扫描使用相同的检查范围
+        conditions = [DB_RECORD_FILTER]
+        params = []
+        if self.exchanges is not None:
+            conditions.append("c.exchange = ANY(%s)")
+            params.append(list(self.exchanges))
+        if self.years is not None:
+            conditions.append("f.fiscal_year = ANY(%s)")
+            params.append(sorted(self.years))
+        where = ' AND '.join(conditions)
+        
+        # 直接使用DBAPI游标，跳过 SQLAlchemy Row 的逐行封装
+        raw_conn = self.engine.raw_connection()
+        try:
+            # 统计数据由数据库 GROUP BY 计算，Python 侧只做路径集合
+            with raw_conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT c.exchange, a.artifact_type, a.status, COUNT(*)
+                    FROM artifacts a
+                    JOIN filings f ON a.filing_id = f.id
+                    JOIN companies c ON f.company_id = c.id
+                    WHERE {where}
+                    GROUP BY c.exchange, a.artifact_type, a.status
+                """, params)
                 
-                self.db_records['total'] += 1
-                if status == 'downloaded':
-                    self.db_records['downloaded'] += 1
-                self.db_records['by_exchange'][exchange] += 1
-                self.db_records['by_type'][artifact_type] += 1
-                self.db_records['by_status'][status] += 1
+                for exchange, artifact_type, status, count in cur.fetchall():
+                    self.db_records['total'] += count
+                    if status == 'downloaded':
+                        self.db_records['downloaded'] += count
+                    self.db_records['by_exchange'][exchange] += count
+                    self.db_records['by_type'][artifact_type] += count
+                    self.db_records['by_status'][status] += count
             
-            print(f"✅ 查询到 {len(db_files)} 条记录")
-            return {
-                'records': db_files,
-                'db_paths': db_paths_set,
-                'db_paths_by_type': db_paths_by_type,
-                'db_paths_by_exchange_type': db_paths_by_exchange_type
-            }
+            # 命名游标在 PostgreSQL 上为服务端游标，内存占用与批大小而非总行数成正比
+            with raw_conn.cursor(name='artifacts_scan') as cur:
+                cur.execute(f"""
+                    SELECT a.local_path, a.artifact_type, c.exchange
+                    FROM artifacts a
+                    JOIN filings f ON a.filing_id = f.id
+                    JOIN companies c ON f.company_id = c.id
+                    WHERE {where}
+                """, params)
+                
+                while True:
+                    rows = cur.fetchmany(DB_FETCH_SIZE)
+                    if not rows:
+                        break
+                    
+                    for local_path, artifact_type, exchange in rows:
+                        if local_path:
+                            db_paths_set.add(local_path)
+                            db_paths_by_type[artifact_type].add(local_path)
+                            db_paths_by_exchange_type[exchange][artifact_type].add(local_path)
+        finally:
+            raw_conn.close()
+        
+        print(f"✅ 查询到 {self.db_records['total']} 条记录")
+        return {
+            'db_paths': db_paths_set,
+            'db_paths_by_type': db_paths_by_type,
+            'db_paths_by_exchange_type': db_paths_by_exchange_type
+        }
     
-    def generate_markdown_report(self, fs_data: Dict, db_data: Dict):
-        """生成Markdown报告"""
+    def generate_markdown_report(self, fs_data: Dict, db_data: Dict, out: TextIO):
+        """生成Markdown报告，逐行写入 out"""
         print("📝 生成Markdown报告...")
         
+        write = out.write
+        
+        def append(line: str):
+            write(line)
+            write('\n')
+        
+        def extend(lines):
+            out.writelines(f"{line}\n" for line in lines)
+        
         fs_paths = fs_data.get('file_paths', set())
         db_paths = db_data.get('db_paths', set())
         
         missing_in_fs = db_paths - fs_paths
         extra_in_fs = fs_paths - db_paths
-        matched = fs_paths & db_paths
+        # 只需要匹配数量：数据库路径中除去缺失的即为匹配
+        missing_count = len(missing_in_fs)
+        extra_count = len(extra_in_fs)
+        matched_total = len(db_paths) - missing_count
         
         # 开始生成报告
-        self.add_line("# 📊 SEC报告数据完整性检查报告")
-        self.add_line()
-        self.add_line(f"**生成时间：** {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}")
-        self.add_line(f"**存储位置：** `{self.storage_root}`")
-        self.add_line(f"**检查范围：** 2023-2025年 NASDAQ & NYSE 上市公司年报/季报")
-        self.add_line()
-        self.add_line("---")
-        self.add_line()
+        append("# 📊 SEC报告数据完整性检查报告")
+        append("")
+        append(f"**生成时间：** {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}")
+        append(f"**存储位置：** `{self.storage_root}`")
+        append(f"**检查范围：** {self._scope_label()} 上市公司年报/季报")
+        append("")
+        append("---")
+        append("")
         
         # 执行摘要
-        self.add_line("## 📋 执行摘要")
-        self.add_line()
+        append("## 📋 执行摘要")
+        append("")
         
-        match_rate = (len(matched) / len(db_paths) * 100) if db_paths else 0
-        score = self._calculate_score(len(matched), len(db_paths), len(missing_in_fs), len(extra_in_fs), len(fs_paths))
+        match_rate = (matched_total / len(db_paths) * 100) if db_paths else 0
+        score = self._calculate_score(matched_total, len(db_paths), missing_count, extra_count, len(fs_paths))
         
         # 计算按类型的匹配率（用于执行摘要）
         fs_paths_by_type = fs_data.get('file_paths_by_type', {})
@@ -233,68 +389,68 @@ class IntegrityReportExporter:
         
         html_fs = fs_paths_by_type.get('html', set())
         html_db = db_paths_by_type.get('html', set())
-        html_matched = html_fs & html_db
-        html_match_rate = (len(html_matched) / len(html_db) * 100) if len(html_db) > 0 else 0
+        html_matched = _count_common(html_fs, html_db)
+        html_match_rate = (html_matched / len(html_db) * 100) if len(html_db) > 0 else 0
         
         image_fs = fs_paths_by_type.get('image', set())
         image_db = db_paths_by_type.get('image', set())
-        image_matched = image_fs & image_db
-        image_match_rate = (len(image_matched) / len(image_db) * 100) if len(image_db) > 0 else 0
-        
-        self.add_line("| 指标 | 数值 | 说明 |")
-        self.add_line("|------|------|------|")
-        self.add_line(f"| **完整性评分** | **{score:.1f}/100** | {self._get_rating(score)} |")
-        self.add_line(f"| 实际文件总数 | {self.file_stats['total_files']:,} | 本地存储的文件数量 |")
-        self.add_line(f"| 文件总大小 | {self.format_size(self.file_stats['total_size'])} | 实际占用存储空间 |")
-        self.add_line(f"| 数据库记录数 | {self.db_records['total']:,} | 应下载的文件记录 |")
-        self.add_line(f"| **总体匹配率** | **{match_rate:.2f}%** | 文件系统与数据库一致性 |")
-        self.add_line(f"| └─ HTML匹配率 | {html_match_rate:.2f}% | HTML文件匹配率 ({len(html_matched):,}/{len(html_db):,}) |")
-        self.add_line(f"| └─ IMAGE匹配率 | {image_match_rate:.2f}% | 图片文件匹配率 ({len(image_matched):,}/{len(image_db):,}) |")
-        self.add_line(f"| 覆盖公司数 | {len(self.file_stats['by_company']):,} | 有文件的公司数量 |")
-        self.add_line()
+        image_matched = _count_common(image_fs, image_db)
+        image_match_rate = (image_matched / len(image_db) * 100) if len(image_db) > 0 else 0
+        
+        append("| 指标 | 数值 | 说明 |")
+        append("|------|------|------|")
+        append(f"| **完整性评分** | **{score:.1f}/100** | {self._get_rating(score)} |")
+        append(f"| 实际文件总数 | {self.file_stats['total_files']:,} | 本地存储的文件数量 |")
+        append(f"| 文件总大小 | {self.format_size(self.file_stats['total_size'])} | 实际占用存储空间 |")
+        append(f"| 数据库记录数 | {self.db_records['total']:,} | 应下载的文件记录 |")
+        append(f"| **总体匹配率** | **{match_rate:.2f}%** | 文件系统与数据库一致性 |")
+        append(f"| └─ HTML匹配率 | {html_match_rate:.2f}% | HTML文件匹配率 ({html_matched:,}/{len(html_db):,}) |")
+        append(f"| └─ IMAGE匹配率 | {image_match_rate:.2f}% | 图片文件匹配率 ({image_matched:,}/{len(image_db):,}) |")
+        append(f"| 覆盖公司数 | {len(self.file_stats['by_company']):,} | 有文件的公司数量 |")
+        append("")
         
         # 数据完整性状态
         if score >= 90:
-            self.add_line("### ✅ 数据质量评估：优秀")
-            self.add_line()
-            self.add_line("数据完整性良好，文件匹配率高，可以放心使用进行分析。")
+            append("### ✅ 数据质量评估：优秀")
+            append("")
+            append("数据完整性良好，文件匹配率高，可以放心使用进行分析。")
         elif score >= 80:
-            self.add_line("### ⚠️ 数据质量评估：良好")
-            self.add_line()
-            self.add_line("数据完整性较好，存在少量问题，建议review后使用。")
+            append("### ⚠️ 数据质量评估：良好")
+            append("")
+            append("数据完整性较好，存在少量问题，建议review后使用。")
         else:
-            self.add_line("### ❌ 数据质量评估：需要改进")
-            self.add_line()
-            self.add_line("数据完整性存在较多问题，建议先修复后再使用。")
+            append("### ❌ 数据质量评估：需要改进")
+            append("")
+            append("数据完整性存在较多问题，建议先修复后再使用。")
         
-        self.add_line()
-        self.add_line("---")
-        self.add_line()
+        append("")
+        append("---")
+        append("")
         
         # 1. 文件系统概览
-        self.add_line("## 📁 文件系统概览")
-        self.add_line()
+        append("## 📁 文件系统概览")
+        append("")
         
-        self.add_line("### 按交易所统计")
-        self.add_line()
-        self.add_line("| 交易所 | 文件数 | 总大小 | 数据库记录 | 完整率 |")
-        self.add_line("|--------|--------|--------|-----------|--------|")
+        append("### 按交易所统计")
+        append("")
+        append("| 交易所 | 文件数 | 总大小 | 数据库记录 | 完整率 |")
+        append("|--------|--------|--------|-----------|--------|")
         
         for exchange in sorted(self.file_stats['by_exchange'].keys()):
             fs_stats = self.file_stats['by_exchange'][exchange]
             db_count = self.db_records['by_exchange'].get(exchange, 0)
             completeness = (fs_stats['count'] / db_count * 100) if db_count > 0 else 0
             
-            self.add_line(f"| {exchange} | {fs_stats['count']:,} | "
-                         f"{self.format_size(fs_stats['size'])} | {db_count:,} | {completeness:.1f}% |")
+            append(EXCHANGE_ROW.format(exchange, fs_stats['count'], self.format_size(fs_stats['size']),
+                                       db_count, completeness))
         
-        self.add_line()
+        append("")
         
         # 按文件类型统计
-        self.add_line("### 按文件类型统计")
-        self.add_line()
-        self.add_line("| 文件类型 | 文件数 | 总大小 | 占比（数量） | 占比（大小） |")
-        self.add_line("|---------|--------|--------|------------|------------|")
+        append("### 按文件类型统计")
+        append("")
+        append("| 文件类型 | 文件数 | 总大小 | 占比（数量） | 占比（大小） |")
+        append("|---------|--------|--------|------------|------------|")
         
         total_count = self.file_stats['total_files']
         total_size = self.file_stats['total_size']
@@ -304,53 +460,52 @@ class IntegrityReportExporter:
             count_pct = (stats['count'] / total_count * 100) if total_count > 0 else 0
             size_pct = (stats['size'] / total_size * 100) if total_size > 0 else 0
             
-            self.add_line(f"| {file_type} | {stats['count']:,} | "
-                         f"{self.format_size(stats['size'])} | {count_pct:.1f}% | {size_pct:.1f}% |")
+            append(FILE_TYPE_ROW.format(file_type, stats['count'], self.format_size(stats['size']),
+                                        count_pct, size_pct))
         
-        self.add_line()
+        append("")
         
         # 按年份统计
-        self.add_line("### 按年份统计")
-        self.add_line()
-        self.add_line("| 年份 | 文件数 | 总大小 | 占比 |")
-        self.add_line("|------|--------|--------|------|")
+        append("### 按年份统计")
+        append("")
+        append("| 年份 | 文件数 | 总大小 | 占比 |")
+        append("|------|--------|--------|------|")
         
         for year in sorted(self.file_stats['by_year'].keys(), reverse=True):
             stats = self.file_stats['by_year'][year]
             pct = (stats['count'] / total_count * 100) if total_count > 0 else 0
             
-            self.add_line(f"| {year} | {stats['count']:,} | "
-                         f"{self.format_size(stats['size'])} | {pct:.1f}% |")
+            append(YEAR_ROW.format(year, stats['count'], self.format_size(stats['size']), pct))
         
-        self.add_line()
-        self.add_line("---")
-        self.add_line()
+        append("")
+        append("---")
+        append("")
         
         # 2. 数据库记录分析
-        self.add_line("## 🗄️ 数据库记录分析")
-        self.add_line()
+        append("## 🗄️ 数据库记录分析")
+        append("")
         
-        self.add_line("### 下载状态分布")
-        self.add_line()
-        self.add_line("| 状态 | 数量 | 占比 |")
-        self.add_line("|------|------|------|")
+        append("### 下载状态分布")
+        append("")
+        append("| 状态 | 数量 | 占比 |")
+        append("|------|------|------|")
         
         for status in sorted(self.db_records['by_status'].keys()):
             count = self.db_records['by_status'][status]
             pct = (count / self.db_records['total'] * 100) if self.db_records['total'] > 0 else 0
             
             status_icon = "✅" if status == 'downloaded' else "⏭️"
-            self.add_line(f"| {status_icon} {status} | {count:,} | {pct:.2f}% |")
+            append(f"| {status_icon} {status} | {count:,} | {pct:.2f}% |")
         
-        self.add_line()
-        self.add_line("---")
-        self.add_line()
+        append("")
+        append("---")
+        append("")
         
         # 3. 按类型统计的完整性（统一口径）
-        self.add_line("## 📐 按类型统计的完整性（统一口径）")
-        self.add_line()
-        self.add_line("### 全局匹配率（按类型）")
-        self.add_line()
+        append("## 📐 按类型统计的完整性（统一口径）")
+        append("")
+        append("### 全局匹配率（按类型）")
+        append("")
         
         fs_paths_by_type = fs_data.get('file_paths_by_type', {})
         db_paths_by_type = db_data.get('db_paths_by_type', {})
@@ -360,38 +515,38 @@ class IntegrityReportExporter:
         for artifact_type in set(list(fs_paths_by_type.keys()) + list(db_paths_by_type.keys())):
             fs_paths_type = fs_paths_by_type.get(artifact_type, set())
             db_paths_type = db_paths_by_type.get(artifact_type, set())
-            matched_type = fs_paths_type & db_paths_type
+            matched_type = _count_common(fs_paths_type, db_paths_type)
             
             type_stats[artifact_type] = {
                 'db_count': len(db_paths_type),
                 'fs_count': len(fs_paths_type),
-                'matched': len(matched_type),
-                'match_rate': (len(matched_type) / len(db_paths_type) * 100) if len(db_paths_type) > 0 else 0
+                'matched': matched_type,
+                'match_rate': (matched_type / len(db_paths_type) * 100) if len(db_paths_type) > 0 else 0
             }
         
-        self.add_line("| 文件类型 | 数据库记录数 | 文件系统文件数 | 匹配数 | 匹配率 |")
-        self.add_line("|---------|------------|--------------|--------|--------|")
+        append("| 文件类型 | 数据库记录数 | 文件系统文件数 | 匹配数 | 匹配率 |")
+        append("|---------|------------|--------------|--------|--------|")
         
         total_db_weighted = 0
         total_matched_weighted = 0
         
         for artifact_type in sorted(type_stats.keys()):
             stats = type_stats[artifact_type]
-            self.add_line(f"| **{artifact_type}** | {stats['db_count']:,} | {stats['fs_count']:,} | "
-                         f"{stats['matched']:,} | **{stats['match_rate']:.2f}%** |")
+            append(f"| **{artifact_type}** | {stats['db_count']:,} | {stats['fs_count']:,} | "
+                   f"{stats['matched']:,} | **{stats['match_rate']:.2f}%** |")
             total_db_weighted += stats['db_count']
             total_matched_weighted += stats['matched']
         
         # 加权总分
         overall_match_rate = (total_matched_weighted / total_db_weighted * 100) if total_db_weighted > 0 else 0
-        self.add_line(f"| **Overall (加权)** | {total_db_weighted:,} | {len(fs_paths):,} | "
-                     f"{total_matched_weighted:,} | **{overall_match_rate:.2f}%** |")
+        append(f"| **Overall (加权)** | {total_db_weighted:,} | {len(fs_paths):,} | "
+               f"{total_matched_weighted:,} | **{overall_match_rate:.2f}%** |")
         
-        self.add_line()
+        append("")
         
         # 按交易所和类型统计
-        self.add_line("### 按交易所和类型统计的完整率")
-        self.add_line()
+        append("### 按交易所和类型统计的完整率")
+        append("")
         
         fs_by_exchange_type = fs_data.get('file_paths_by_exchange_type', {})
         db_by_exchange_type = db_data.get('db_paths_by_exchange_type', {})
@@ -399,10 +554,10 @@ class IntegrityReportExporter:
         all_exchanges = sorted(set(list(fs_by_exchange_type.keys()) + list(db_by_exchange_type.keys())))
         
         for exchange in all_exchanges:
-            self.add_line(f"#### {exchange}")
-            self.add_line()
-            self.add_line("| 文件类型 | 数据库记录数 | 文件系统文件数 | 匹配数 | 匹配率 |")
-            self.add_line("|---------|------------|--------------|--------|--------|")
+            append(f"#### {exchange}")
+            append("")
+            append("| 文件类型 | 数据库记录数 | 文件系统文件数 | 匹配数 | 匹配率 |")
+            append("|---------|------------|--------------|--------|--------|")
             
             fs_exchange = fs_by_exchange_type.get(exchange, {})
             db_exchange = db_by_exchange_type.get(exchange, {})
@@ -415,82 +570,78 @@ class IntegrityReportExporter:
             for artifact_type in all_types:
                 fs_paths_ex_type = fs_exchange.get(artifact_type, set())
                 db_paths_ex_type = db_exchange.get(artifact_type, set())
-                matched_ex_type = fs_paths_ex_type & db_paths_ex_type
                 
                 db_count = len(db_paths_ex_type)
                 fs_count = len(fs_paths_ex_type)
-                matched_count = len(matched_ex_type)
+                matched_count = _count_common(fs_paths_ex_type, db_paths_ex_type)
                 match_rate = (matched_count / db_count * 100) if db_count > 0 else 0
                 
-                self.add_line(f"| {artifact_type} | {db_count:,} | {fs_count:,} | "
-                             f"{matched_count:,} | {match_rate:.2f}% |")
+                append(MATCH_ROW.format(artifact_type, db_count, fs_count, matched_count, match_rate))
                 
                 exchange_total_db += db_count
                 exchange_total_matched += matched_count
             
             # 交易所加权总分
             exchange_overall = (exchange_total_matched / exchange_total_db * 100) if exchange_total_db > 0 else 0
-            self.add_line(f"| **小计 (加权)** | {exchange_total_db:,} | - | "
-                         f"{exchange_total_matched:,} | **{exchange_overall:.2f}%** |")
-            self.add_line()
+            append(f"| **小计 (加权)** | {exchange_total_db:,} | - | "
+                   f"{exchange_total_matched:,} | **{exchange_overall:.2f}%** |")
+            append("")
         
-        self.add_line("---")
-        self.add_line()
+        append("---")
+        append("")
         
         # 4. 完整性分析
-        self.add_line("## 🔍 完整性分析（总体）")
-        self.add_line()
+        append("## 🔍 完整性分析（总体）")
+        append("")
         
-        self.add_line(f"- **匹配文件数：** {len(matched):,}")
-        self.add_line(f"- **匹配率：** {match_rate:.2f}%")
-        self.add_line(f"- **缺失文件数：** {len(missing_in_fs):,}")
-        self.add_line(f"- **多余文件数：** {len(extra_in_fs):,}")
-        self.add_line()
+        append(f"- **匹配文件数：** {matched_total:,}")
+        append(f"- **匹配率：** {match_rate:.2f}%")
+        append(f"- **缺失文件数：** {missing_count:,}")
+        append(f"- **多余文件数：** {extra_count:,}")
+        append("")
         
         if missing_in_fs:
-            self.add_line("### ⚠️ 缺失文件列表（前50个）")
-            self.add_line()
-            self.add_line("以下文件在数据库中有记录，但在文件系统中缺失：")
-            self.add_line()
-            for i, path in enumerate(list(missing_in_fs)[:50], 1):
-                self.add_line(f"{i}. `{path}`")
+            append("### ⚠️ 缺失文件列表（前50个）")
+            append("")
+            append("以下文件在数据库中有记录，但在文件系统中缺失：")
+            append("")
+            extend(f"{i}. `{path}`" for i, path in enumerate(islice(missing_in_fs, 50), 1))
             
-            if len(missing_in_fs) > 50:
-                self.add_line(f"\n... 还有 {len(missing_in_fs) - 50} 个文件未列出")
-            self.add_line()
+            if missing_count > 50:
+                append(f"\n... 还有 {missing_count - 50} 个文件未列出")
+            append("")
         
         if extra_in_fs:
-            self.add_line("### ℹ️ 多余文件列表（前50个）")
-            self.add_line()
-            self.add_line("以下文件存在于文件系统中，但数据库中没有记录：")
-            self.add_line()
-            for i, path in enumerate(list(extra_in_fs)[:50], 1):
-                self.add_line(f"{i}. `{path}`")
+            append("### ℹ️ 多余文件列表（前50个）")
+            append("")
+            append("以下文件存在于文件系统中，但数据库中没有记录：")
+            append("")
+            extend(f"{i}. `{path}`" for i, path in enumerate(islice(extra_in_fs, 50), 1))
             
-            if len(extra_in_fs) > 50:
-                self.add_line(f"\n... 还有 {len(extra_in_fs) - 50} 个文件未列出")
-            self.add_line()
+            if extra_count > 50:
+                append(f"\n... 还有 {extra_count - 50} 个文件未列出")
+            append("")
         
         if not missing_in_fs and not extra_in_fs:
-            self.add_line("### ✅ 完美匹配")
-            self.add_line()
-            self.add_line("所有文件都完美匹配，没有缺失或多余的文件。")
-            self.add_line()
+            append("### ✅ 完美匹配")
+            append("")
+            append("所有文件都完美匹配，没有缺失或多余的文件。")
+            append("")
         
-        self.add_line("---")
-        self.add_line()
+        append("---")
+        append("")
         
         # 4. 公司覆盖率分析
-        self.add_line("## 🏢 公司覆盖率分析")
-        self.add_line()
+        append("## 🏢 公司覆盖率分析")
+        append("")
         
-        self.add_line(f"**总覆盖公司数：** {len(self.file_stats['by_company']):,} 家")
-        self.add_line()
+        append(f"**总覆盖公司数：** {len(self.file_stats['by_company']):,} 家")
+        append("")
         
-        self.add_line("### Top 30 公司（按文件数排序）")
-        self.add_line()
-        self.add_line("| 排名 | 公司 (交易所/代码) | 文件数 |")
-        self.add_line("|------|------------------|--------|")
+        append("### Top 30 公司（按文件数排序）")
+        append("")
+        append("| 排名 | 公司 (交易所/代码) | 文件数 |")
+        append("|------|------------------|--------|")
         
         top_companies = sorted(
             self.file_stats['by_company'].items(),
@@ -498,111 +649,111 @@ class IntegrityReportExporter:
             reverse=True
         )[:30]
         
-        for rank, (company, count) in enumerate(top_companies, 1):
-            self.add_line(f"| {rank} | `{company}` | {count:,} |")
+        extend(COMPANY_ROW.format(rank, company, count)
+               for rank, (company, count) in enumerate(top_companies, 1))
         
-        self.add_line()
-        self.add_line("---")
-        self.add_line()
+        append("")
+        append("---")
+        append("")
         
         # 5. 数据质量指标
-        self.add_line("## 📊 数据质量指标")
-        self.add_line()
+        append("## 📊 数据质量指标")
+        append("")
         
-        missing_rate = (len(missing_in_fs) / len(db_paths) * 100) if db_paths else 0
-        extra_rate = (len(extra_in_fs) / len(fs_paths) * 100) if fs_paths else 0
+        missing_rate = (missing_count / len(db_paths) * 100) if db_paths else 0
+        extra_rate = (extra_count / len(fs_paths) * 100) if fs_paths else 0
         
-        self.add_line("| 指标 | 数值 | 目标 | 状态 |")
-        self.add_line("|------|------|------|------|")
-        self.add_line(f"| 文件匹配率 | {match_rate:.2f}% | ≥99% | {self._status_icon(match_rate >= 99)} |")
-        self.add_line(f"| 缺失率 | {missing_rate:.2f}% | ≤1% | {self._status_icon(missing_rate <= 1)} |")
-        self.add_line(f"| 多余文件率 | {extra_rate:.2f}% | ≤1% | {self._status_icon(extra_rate <= 1)} |")
+        append("| 指标 | 数值 | 目标 | 状态 |")
+        append("|------|------|------|------|")
+        append(f"| 文件匹配率 | {match_rate:.2f}% | ≥99% | {self._status_icon(match_rate >= 99)} |")
+        append(f"| 缺失率 | {missing_rate:.2f}% | ≤1% | {self._status_icon(missing_rate <= 1)} |")
+        append(f"| 多余文件率 | {extra_rate:.2f}% | ≤1% | {self._status_icon(extra_rate <= 1)} |")
         
         avg_files_per_company = self.file_stats['total_files'] / len(self.file_stats['by_company']) if self.file_stats['by_company'] else 0
-        self.add_line(f"| 平均文件数/公司 | {avg_files_per_company:.1f} | ≥15 | {self._status_icon(avg_files_per_company >= 15)} |")
+        append(f"| 平均文件数/公司 | {avg_files_per_company:.1f} | ≥15 | {self._status_icon(avg_files_per_company >= 15)} |")
         
-        self.add_line()
-        self.add_line("---")
-        self.add_line()
+        append("")
+        append("---")
+        append("")
         
         # 6. 建议和后续行动
-        self.add_line("## 💡 建议和后续行动")
-        self.add_line()
+        append("## 💡 建议和后续行动")
+        append("")
         
         if score >= 95:
-            self.add_line("### ✅ 数据质量优秀")
-            self.add_line()
-            self.add_line("1. 数据完整性非常好，可以直接用于生产分析")
-            self.add_line("2. 建议定期运行完整性检查，确保持续质量")
-            self.add_line("3. 考虑设置自动化的数据备份流程")
+            append("### ✅ 数据质量优秀")
+            append("")
+            append("1. 数据完整性非常好，可以直接用于生产分析")
+            append("2. 建议定期运行完整性检查，确保持续质量")
+            append("3. 考虑设置自动化的数据备份流程")
         elif score >= 80:
-            self.add_line("### ⚠️ 需要关注的问题")
-            self.add_line()
+            append("### ⚠️ 需要关注的问题")
+            append("")
             if missing_in_fs:
-                self.add_line(f"1. 有 {len(missing_in_fs)} 个文件缺失，建议重新下载")
+                append(f"1. 有 {missing_count} 个文件缺失，建议重新下载")
             if extra_in_fs:
-                self.add_line(f"2. 有 {len(extra_in_fs)} 个多余文件，建议review并清理")
-            self.add_line("3. 建议运行增量更新补齐缺失数据")
+                append(f"2. 有 {extra_count} 个多余文件，建议review并清理")
+            append("3. 建议运行增量更新补齐缺失数据")
         else:
-            self.add_line("### ❌ 需要立即处理")
-            self.add_line()
-            self.add_line("1. **优先级1：** 修复缺失的文件")
-            self.add_line("2. **优先级2：** 清理多余的文件")
-            self.add_line("3. **优先级3：** 验证数据库记录的准确性")
-        
-        self.add_line()
-        
-        self.add_line("### 推荐命令")
-        self.add_line()
-        self.add_line("```bash")
-        self.add_line("# 运行增量更新")
-        self.add_line("python main.py incremental")
-        self.add_line()
-        self.add_line("# 重新检查完整性")
-        self.add_line("python export_integrity_report.py")
-        self.add_line()
-        self.add_line("# 查看数据库状态")
-        self.add_line("python query_db_summary.py")
-        self.add_line("```")
-        self.add_line()
-        self.add_line("---")
-        self.add_line()
+            append("### ❌ 需要立即处理")
+            append("")
+            append("1. **优先级1：** 修复缺失的文件")
+            append("2. **优先级2：** 清理多余的文件")
+            append("3. **优先级3：** 验证数据库记录的准确性")
+        
+        append("")
+        
+        append("### 推荐命令")
+        append("")
+        append("```bash")
+        append("# 运行增量更新")
+        append("python main.py incremental")
+        append("")
+        append("# 重新检查完整性")
+        append("python export_integrity_report.py")
+        append("")
+        append("# 查看数据库状态")
+        append("python query_db_summary.py")
+        append("```")
+        append("")
+        append("---")
+        append("")
         
         # 附录
-        self.add_line("## 📎 附录")
-        self.add_line()
-        
-        self.add_line("### 技术规格")
-        self.add_line()
-        self.add_line(f"- **存储根目录：** `{self.storage_root}`")
-        self.add_line(f"- **数据库：** PostgreSQL")
-        self.add_line(f"- **扫描时间：** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        self.add_line(f"- **Python版本：** {sys.version.split()[0]}")
-        self.add_line()
-        
-        self.add_line("### 评分标准")
-        self.add_line()
-        self.add_line("完整性评分计算方式：")
-        self.add_line()
-        self.add_line("- **文件匹配率（50分）：** 匹配文件数 / 数据库记录数 × 50")
-        self.add_line("- **缺失率得分（25分）：** max(0, 25 - 缺失率 × 100)")
-        self.add_line("- **多余文件得分（25分）：** max(0, 25 - 多余率 × 100)")
-        self.add_line()
-        
-        self.add_line("### 评级说明")
-        self.add_line()
-        self.add_line("| 分数范围 | 评级 | 说明 |")
-        self.add_line("|---------|------|------|")
-        self.add_line("| 90-100 | ⭐⭐⭐⭐⭐ 优秀 | 数据质量极佳 |")
-        self.add_line("| 80-89 | ⭐⭐⭐⭐ 良好 | 数据质量较好 |")
-        self.add_line("| 70-79 | ⭐⭐⭐ 中等 | 需要关注 |")
-        self.add_line("| 60-69 | ⭐⭐ 及格 | 需要改进 |")
-        self.add_line("| <60 | ⭐ 不及格 | 需要立即处理 |")
-        self.add_line()
-        
-        self.add_line("---")
-        self.add_line()
-        self.add_line(f"*报告生成于 {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')} by 文件完整性检查工具*")
+        append("## 📎 附录")
+        append("")
+        
+        append("### 技术规格")
+        append("")
+        append(f"- **存储根目录：** `{self.storage_root}`")
+        append(f"- **数据库：** PostgreSQL")
+        append(f"- **扫描时间：** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        append(f"- **Python版本：** {sys.version.split()[0]}")
+        append("")
+        
+        append("### 评分标准")
+        append("")
+        append("完整性评分计算方式：")
+        append("")
+        append("- **文件匹配率（50分）：** 匹配文件数 / 数据库记录数 × 50")
+        append("- **缺失率得分（25分）：** max(0, 25 - 缺失率 × 100)")
+        append("- **多余文件得分（25分）：** max(0, 25 - 多余率 × 100)")
+        append("")
+        
+        append("### 评级说明")
+        append("")
+        append("| 分数范围 | 评级 | 说明 |")
+        append("|---------|------|------|")
+        append("| 90-100 | ⭐⭐⭐⭐⭐ 优秀 | 数据质量极佳 |")
+        append("| 80-89 | ⭐⭐⭐⭐ 良好 | 数据质量较好 |")
+        append("| 70-79 | ⭐⭐⭐ 中等 | 需要关注 |")
+        append("| 60-69 | ⭐⭐ 及格 | 需要改进 |")
+        append("| <60 | ⭐ 不及格 | 需要立即处理 |")
+        append("")
+        
+        append("---")
+        append("")
+        append(f"*报告生成于 {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')} by 文件完整性检查工具*")
         
         print("✅ Markdown报告生成完成")
     
@@ -639,20 +790,26 @@ class IntegrityReportExporter:
         else:
             return "⭐ 不及格"
     
+    def _scope_label(self) -> str:
+        """检查范围描述"""
+        years = f"{min(self.years)}-{max(self.years)}年" if self.years else "全部年份"
+        exchanges = ' & '.join(self.exchanges) if self.exchanges else "全部交易所"
+        return f"{years} {exchanges}"
+    
     def _status_icon(self, condition: bool) -> str:
         """状态图标"""
         return "✅" if condition else "⚠️"
     
-    def save_report(self, output_file: str = None):
-        """保存报告到文件"""
+    def save_report(self, fs_data: Dict, db_data: Dict, output_file: str = None):
+        """生成报告并直接流式写入文件"""
         if output_file is None:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             output_file = f"integrity_report_{timestamp}.md"
         
         output_path = Path(output_file)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(self.report_lines))
+        with open(output_path, 'w', encoding='utf-8', buffering=REPORT_BUFFER_SIZE) as f:
+            self.generate_markdown_report(fs_data, db_data, f)
         
         print(f"\n✅ 报告已保存到: {output_path.absolute()}")
         print(f"   文件大小: {output_path.stat().st_size:,} 字节")
@@ -672,11 +829,8 @@ class IntegrityReportExporter:
             # 2. 查询数据库
             db_data = self.query_database_records()
             
-            # 3. 生成Markdown报告
-            self.generate_markdown_report(fs_data, db_data)
-            
-            # 4. 保存报告
-            report_path = self.save_report(output_file)
+            # 3. 生成Markdown报告并写入文件
+            report_path = self.save_report(fs_data, db_data, output_file)
             
             print("\n" + "=" * 100)
             print("✅ 报告生成成功！")
@@ -697,9 +851,17 @@ def main():
     
     parser = argparse.ArgumentParser(description='导出文件完整性报告为Markdown格式')
     parser.add_argument('-o', '--output', type=str, help='输出文件名（默认：integrity_report_YYYYMMDD_HHMMSS.md）')
+    parser.add_argument('--exchanges', nargs='+', default=list(SCAN_EXCHANGES),
+                        help=f"检查的交易所（默认：{' '.join(SCAN_EXCHANGES)}）")
+    parser.add_argument('--years', nargs='+', type=int, default=list(SCAN_YEARS),
+                        help=f'检查的财年（默认：{SCAN_YEARS.start}-{SCAN_YEARS.stop - 1}）')
+    parser.add_argument('--all', action='store_true', help='不限交易所和年份，检查全部文件')
     args = parser.parse_args()
     
-    exporter = IntegrityReportExporter()
+    if args.all:
+        exporter = IntegrityReportExporter(exchanges=None, years=None)
+    else:
+        exporter = IntegrityReportExporter(exchanges=args.exchanges, years=args.years)
     report_path = exporter.run(args.output)
     
     if report_path:
@@ -2,16 +2,111 @@
 修复artifacts表中的重复SHA256值
 保留最新的记录，删除旧的重复记录
 """
+import json
 import sys
 from sqlalchemy import create_engine, text
 from config.settings import settings
 
-def fix_duplicate_sha256(dry_run=True):
+# 每批删除的记录数：分批提交，避免单个大事务长时间持锁和堆积WAL
+DELETE_BATCH_SIZE = 5000
+
+# 自连接候选查询的估算代价（EXPLAIN Total Cost）超过该值时改用保留表方案
+KEEPER_TABLE_COST_THRESHOLD = 1_000_000
+
+# 自连接：存在同SHA256且更新的记录即为待删除记录，规划器可直接走 hash/merge join
+# created_at 为空时视为最新（与 ORDER BY created_at DESC 的 NULLS FIRST 一致）
+SELF_JOIN_CANDIDATES_SQL = """
+    SELECT a.id
+    FROM artifacts a
+    WHERE a.sha256 IS NOT NULL
+      AND EXISTS (
+          SELECT 1
+          FROM artifacts b
+          WHERE b.sha256 = a.sha256
+            AND (COALESCE(b.created_at, 'infinity'::timestamp), b.id)
+              > (COALESCE(a.created_at, 'infinity'::timestamp), a.id)
+      )
+"""
+
+# 保留表：同SHA256中不是保留记录的即为待删除记录
+# 只处理建表时已存在的记录（id <= :max_id），执行期间新写入的记录不受影响
+KEEPER_CANDIDATES_SQL = """
+    SELECT a.id
+    FROM artifacts a
+    WHERE a.id <= :max_id
+      AND EXISTS (
+          SELECT 1
+          FROM dedup_keep k
+          WHERE k.sha256 = a.sha256
+            AND k.id <> a.id
+      )
+"""
+
+
+def estimate_cost(conn, sql, params=None):
+    """用 EXPLAIN 获取查询的估算总代价（不实际执行查询）"""
+    plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql), params or {}).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Total Cost']
+
+
+def create_keeper_table(conn):
+    """
+    建立保留记录临时表：每个SHA256保留最新的一条
+    
+    Returns:
+        建表时artifacts的最大id
+    """
+    max_id = conn.execute(text("SELECT MAX(id) FROM artifacts")).scalar()
+    # 按 idx_artifacts_sha256_dedup 的键顺序扫描，每组取第一条，无需排序（见 migration 010）
+    conn.execute(text("""
+        CREATE TEMP TABLE dedup_keep AS
+        SELECT DISTINCT ON (sha256) id, sha256
+        FROM artifacts
+        WHERE sha256 IS NOT NULL
+          AND id <= :max_id
+        ORDER BY sha256, created_at DESC, id DESC;
+    """), {'max_id': max_id})
+    conn.execute(text("CREATE INDEX ON dedup_keep (sha256)"))
+    conn.execute(text("ANALYZE dedup_keep"))
+    conn.commit()
+    return max_id
+
+
+def delete_in_batches(conn, candidates_sql, params, batch_size, total_to_delete):
+    """
+    分批删除候选查询选出的记录，每批单独提交
+    
+    Returns:
+        删除的记录总数
+    """
+    deleted_count = 0
+    batch_num = 0
+    while True:
+        result = conn.execute(text(f"""
+            DELETE FROM artifacts d
+            USING ({candidates_sql} LIMIT :batch_size) t
+            WHERE d.id = t.id;
+        """), {**params, 'batch_size': batch_size})
+        conn.commit()
+        
+        batch_count = result.rowcount
+        deleted_count += batch_count
+        batch_num += 1
+        print(f"   批次 {batch_num}: 删除 {batch_count} 条 (累计 {deleted_count}/{total_to_delete})")
+        
+        if batch_count < batch_size:
+            return deleted_count
+
+
+def fix_duplicate_sha256(dry_run=True, batch_size=DELETE_BATCH_SIZE):
     """
     修复重复的SHA256值
     
     Args:
         dry_run: 如果为True，只显示将要删除的记录，不实际删除
+        batch_size: 每批删除并提交的记录数
     """
     engine = create_engine(settings.database_url)
     
@@ -20,7 +115,7 @@ def fix_duplicate_sha256(dry_run=True):
     print("=" * 80)
     
     try:
-        with engine.begin() as conn:
+        with engine.connect() as conn:
             # 1. 查找重复的SHA256
             print("\n1. 查找重复的SHA256值...")
             result = conn.execute(text("""
@@ -51,22 +146,15 @@ def fix_duplicate_sha256(dry_run=True):
             if dry_run:
                 print("\n   【预览模式】显示将要删除的记录示例:")
                 result = conn.execute(text("""
-                    WITH ranked_artifacts AS (
-                        SELECT 
-                            id,
-                            sha256,
-                            created_at,
-                            status,
-                            ROW_NUMBER() OVER (
-                                PARTITION BY sha256 
-                                ORDER BY created_at DESC, id DESC
-                            ) as rn
-                        FROM artifacts
-                        WHERE sha256 IS NOT NULL
-                    )
                     SELECT id, sha256, created_at, status
-                    FROM ranked_artifacts
-                    WHERE rn > 1
+                    FROM artifacts
+                    WHERE sha256 IS NOT NULL
+                      AND id NOT IN (
+                          SELECT DISTINCT ON (sha256) id
+                          FROM artifacts
+                          WHERE sha256 IS NOT NULL
+                          ORDER BY sha256, created_at DESC, id DESC
+                      )
                     LIMIT 10;
                 """))
                 
@@ -84,42 +172,43 @@ def fix_duplicate_sha256(dry_run=True):
                 print("\n3. 开始删除重复记录...")
                 print("   保留策略：对于每个重复的SHA256，保留最新的一条记录（按created_at DESC, id DESC）")
                 
-                # 使用CTE删除重复记录，保留最新的
-                result = conn.execute(text("""
-                    WITH ranked_artifacts AS (
-                        SELECT 
-                            id,
-                            ROW_NUMBER() OVER (
-                                PARTITION BY sha256 
-                                ORDER BY created_at DESC, id DESC
-                            ) as rn
-                        FROM artifacts
-                        WHERE sha256 IS NOT NULL
-                    )
-                    DELETE FROM artifacts
-                    WHERE id IN (
-                        SELECT id 
-                        FROM ranked_artifacts 
-                        WHERE rn > 1
+                # 先用 EXPLAIN 估算自连接的代价，过大时改用保留表 + 半连接删除
+                cost = estimate_cost(conn, SELF_JOIN_CANDIDATES_SQL)
+                print(f"   自连接估算代价: {cost:,.0f}")
+                
+                # 每批最多删除 batch_size 条并单独提交
+                if cost > KEEPER_TABLE_COST_THRESHOLD:
+                    print("   代价较高，改用保留表方案（先建立每个SHA256的保留记录临时表）")
+                    max_id = create_keeper_table(conn)
+                    try:
+                        deleted_count = delete_in_batches(
+                            conn, KEEPER_CANDIDATES_SQL, {'max_id': max_id},
+                            batch_size, total_to_delete
+                        )
+                    finally:
+                        conn.rollback()
+                        conn.execute(text("DROP TABLE IF EXISTS dedup_keep"))
+                        conn.commit()
+                else:
+                    deleted_count = delete_in_batches(
+                        conn, SELF_JOIN_CANDIDATES_SQL, {},
+                        batch_size, total_to_delete
                     )
-                    RETURNING id;
-                """))
                 
-                deleted_count = result.rowcount
                 print(f"   ✅ 成功删除 {deleted_count} 条重复记录")
                 
-                # 4. 验证
+                # 4. 验证：只需检查第1步发现的重复SHA256，无需再次全表 GROUP BY
                 print("\n4. 验证结果...")
                 result = conn.execute(text("""
                     SELECT COUNT(*)
                     FROM (
                         SELECT sha256
                         FROM artifacts
-                        WHERE sha256 IS NOT NULL
+                        WHERE sha256 = ANY(:duplicate_sha256s)
                         GROUP BY sha256
                         HAVING COUNT(*) > 1
                     ) t;
-                """))
+                """), {'duplicate_sha256s': [sha256 for sha256, _ in duplicates]})
                 remaining_duplicates = result.scalar()
                 
                 if remaining_duplicates == 0:
@@ -141,6 +230,8 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='修复artifacts表中的重复SHA256值')
     parser.add_argument('--execute', action='store_true', 
                         help='实际执行删除（默认只预览）')
+    parser.add_argument('--batch-size', type=int, default=DELETE_BATCH_SIZE,
+                        help=f'每批删除的记录数（默认 {DELETE_BATCH_SIZE}）')
     args = parser.parse_args()
     
     if args.execute:
@@ -149,5 +240,5 @@ if __name__ == '__main__':
             print("操作已取消")
             sys.exit(0)
     
-    fix_duplicate_sha256(dry_run=not args.execute)
+    fix_duplicate_sha256(dry_run=not args.execute, batch_size=args.batch_size)
 
@@ -7,270 +7,168 @@
   python fix_html_image_links.py --sample 50          # 随机抽样50个文件
   python fix_html_image_links.py --exchange NASDAQ    # 只修复NASDAQ
   python fix_html_image_links.py --dry-run            # 预览模式，不实际修改
+  python fix_html_image_links.py --no-backup          # 不备份原文件（默认备份为 .bak）
 """
 
 import argparse
-import re
 import sys
 from pathlib import Path
-from collections import defaultdict
 from typing import Dict, List
-import random
 
-from bs4 import BeautifulSoup
-from sqlalchemy import create_engine, text
-from config.settings import settings
 import structlog
 
+from services.html_image_links import HTMLImageLinkFixerBase
+
 logger = structlog.get_logger()
 
+# 加载图片映射时每批从服务端游标读取的行数
+MAPPING_FETCH_SIZE = 10000
+
 
-class HTMLImageLinkFixer:
-    """HTML图片链接修复器"""
+class HTMLImageLinkFixer(HTMLImageLinkFixerBase):
+    """HTML图片链接修复器（按数据库中的图片记录映射）"""
     
-    def __init__(self, dry_run: bool = False):
-        self.storage_root = Path(settings.storage_root)
-        self.dry_run = dry_run
-        self.engine = create_engine(settings.database_url)
+    def __init__(self, dry_run: bool = False, strict: bool = False, backup: bool = True,
+                 workers: int = None):
+        super().__init__(dry_run=dry_run, strict=strict, backup=backup, workers=workers)
         
-        # 统计数据
-        self.stats = {
-            'total_files': 0,
-            'files_fixed': 0,
-            'links_fixed': 0,
-            'errors': 0
-        }
+        from config.settings import settings
+        self.database_url = settings.database_url
         
-    def get_image_mapping(self, html_path: Path) -> Dict[str, str]:
+        # HTML相对路径 -> {原始URL: 相对路径}，由 load_image_mappings 一次性加载
+        self._mapping_by_html: Dict[str, Dict[str, str]] = {}
+    
+    def load_image_mappings(self):
         """
-        获取该HTML文件对应的图片映射
-        从数据库查询该filing的所有图片，建立URL到本地相对路径的映射
-        
-        Returns:
-            {原始URL: 相对路径}
+        一次性加载所有HTML文件对应的图片映射
+        用一条JOIN查询替代每个HTML文件两次查询
         """
-        # 从HTML路径提取信息
-        # 格式: NASDAQ/AAPL/2023/aapl-20230930.htm
-        relative_path = str(html_path.relative_to(self.storage_root))
+        print(f"📥 加载图片映射...")
         
-        with self.engine.connect() as conn:
-            # 查找该HTML文件对应的artifact
-            result = conn.execute(text("""
-                SELECT a.id, a.filing_id
-                FROM artifacts a
-                WHERE a.local_path = :html_path
-                  AND a.artifact_type = 'html'
-                LIMIT 1
-            """), {'html_path': relative_path})
-            
-            row = result.fetchone()
-            if not row:
-                logger.warning("html_artifact_not_found", path=relative_path)
-                return {}
-            
-            artifact_id, filing_id = row
-            
-            # 查询该filing的所有图片
-            result = conn.execute(text("""
-                SELECT url, local_path, filename
-                FROM artifacts
-                WHERE filing_id = :filing_id
-                  AND artifact_type = 'image'
-                  AND status IN ('downloaded', 'skipped')
-            """), {'filing_id': filing_id})
-            
-            mapping = {}
-            for row in result:
-                url, local_path, filename = row
-                
-                # 计算相对路径
-                # HTML在: NYSE/AB/2024/ab-20231231.html
-                # 图片在: NYSE/AB/2024/ab-20231231_image-001.jpg
-                # 相对路径: ./ab-20231231_image-001.jpg
-                if local_path:
-                    image_path = Path(local_path)
-                    relative_to_html = f"./{image_path.name}"
-                    mapping[url] = relative_to_html
-            
-            logger.debug(
-                "image_mapping_built",
-                html_path=relative_path,
-                filing_id=filing_id,
-                image_count=len(mapping)
-            )
-            
-            return mapping
-    
-    def fix_html_file(self, html_path: Path) -> Dict:
-        """修复单个HTML文件"""
-        result = {
-            'path': str(html_path.relative_to(self.storage_root)),
-            'fixed': False,
-            'links_fixed': 0,
-            'original_links': [],
-            'new_links': []
-        }
+        mapping_by_html = {}
         
+        from sqlalchemy import create_engine, text
+        
+        # 整个运行只需这一条查询：用一个连接完成后立即释放连接池，
+        # 工作进程 fork 时不会继承打开的数据库连接
+        engine = create_engine(self.database_url)
         try:
-            # 读取HTML文件
-            with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
-                original_content = f.read()
-            
-            # 获取图片映射
-            image_mapping = self.get_image_mapping(html_path)
-            
-            if not image_mapping:
-                logger.debug("no_images_for_html", path=result['path'])
-                return result
-            
-            # 解析HTML
-            soup = BeautifulSoup(original_content, 'lxml')
-            img_tags = soup.find_all('img')
-            
-            modified = False
-            
-            for img in img_tags:
-                src = img.get('src', '')
+            with engine.connect() as conn:
+                # LEFT JOIN：没有图片的HTML也保留一条空映射，用于区分"未入库"
+                # 服务端游标分批读取，结果集再大也不会一次性全部载入内存
+                result = conn.execution_options(
+                    stream_results=True,
+                    yield_per=MAPPING_FETCH_SIZE
+                ).execute(text("""
+                    SELECT h.local_path, i.url, i.local_path
+                    FROM artifacts h
+                    LEFT JOIN artifacts i
+                      ON i.filing_id = h.filing_id
+                     AND i.artifact_type = 'image'
+                     AND i.status IN ('downloaded', 'skipped')
+                    WHERE h.artifact_type = 'html'
+                      AND h.local_path IS NOT NULL
+                """))
                 
-                if not src:
-                    continue
-                
-                # 尝试匹配原始URL
-                new_src = None
-                
-                # 直接匹配
-                if src in image_mapping:
-                    new_src = image_mapping[src]
-                else:
-                    # 尝试去掉file:///前缀匹配
-                    if src.startswith('file:///'):
-                        # file:///private/tmp/filings/NYSE/AB/2024/ab-20231231_g2.jpg
-                        # 提取文件名部分
-                        filename = Path(src).name
-                        
-                        # 在映射中查找包含此文件名的URL
-                        for url, relative_path in image_mapping.items():
-                            if filename in url or filename in relative_path:
-                                new_src = relative_path
-                                break
+                for html_path, url, local_path in result:
+                    mapping = mapping_by_html.setdefault(html_path, {})
                     
-                    # 尝试匹配URL中的文件名
-                    if not new_src:
-                        src_filename = Path(src).name
-                        for url, relative_path in image_mapping.items():
-                            url_filename = Path(url).name
-                            if src_filename == url_filename:
-                                new_src = relative_path
-                                break
-                
-                # 如果找到了新的相对路径，进行替换
-                if new_src and new_src != src:
-                    result['original_links'].append(src)
-                    result['new_links'].append(new_src)
-                    img['src'] = new_src
-                    modified = True
-                    result['links_fixed'] += 1
-            
-            if modified and not self.dry_run:
-                # 保存修改后的HTML
-                new_content = str(soup)
-                
-                # 备份原文件
-                backup_path = html_path.with_suffix('.html.bak')
-                if not backup_path.exists():
-                    with open(backup_path, 'w', encoding='utf-8') as f:
-                        f.write(original_content)
-                
-                # 写入新内容
-                with open(html_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-                
-                result['fixed'] = True
-                self.stats['files_fixed'] += 1
-                self.stats['links_fixed'] += result['links_fixed']
-                
-                logger.info(
-                    "html_fixed",
-                    path=result['path'],
-                    links_fixed=result['links_fixed']
-                )
-            elif modified:
-                result['fixed'] = True  # Would be fixed
-                self.stats['links_fixed'] += result['links_fixed']
-            
-            return result
-            
-        except Exception as e:
-            result['error'] = str(e)
-            self.stats['errors'] += 1
-            logger.error("fix_failed", path=result['path'], error=str(e))
-            return result
+                    # 计算相对路径
+                    # HTML在: NYSE/AB/2024/ab-20231231.html
+                    # 图片在: NYSE/AB/2024/ab-20231231_image-001.jpg
+                    # 相对路径: ./ab-20231231_image-001.jpg
+                    if local_path:
+                        image_path = Path(local_path)
+                        mapping[url] = f"./{image_path.name}"
+        finally:
+            engine.dispose()
+        
+        self._mapping_by_html = mapping_by_html
+        print(f"✅ 加载了 {len(mapping_by_html)} 个HTML文件的图片映射")
+    
+    def prepare(self):
+        """处理文件前一次性加载图片映射"""
+        self.load_image_mappings()
     
-    def scan_html_files(self, exchange: str = None, sample_size: int = None) -> List[Path]:
-        """扫描HTML文件"""
-        print(f"📁 扫描HTML文件...")
+    def get_image_mapping(self, html_path: Path, result: Dict) -> Dict[str, str]:
+        """
+        获取该HTML文件对应的图片映射（从预加载的映射中查找）
         
-        if not self.storage_root.exists():
-            print(f"⚠️  存储目录不存在: {self.storage_root}")
-            return []
+        Returns:
+            {原始URL: 相对路径}
+        """
+        # 格式: NASDAQ/AAPL/2023/aapl-20230930.htm
+        relative_path = result['path']
         
-        html_files = []
+        mapping = self._mapping_by_html.get(relative_path)
+        if mapping is None:
+            logger.warning("html_artifact_not_found", path=relative_path)
+            return {}
         
-        for exchange_dir in self.storage_root.iterdir():
-            if not exchange_dir.is_dir():
-                continue
-            
-            if exchange and exchange_dir.name != exchange:
-                continue
-            
-            for company_dir in exchange_dir.iterdir():
-                if not company_dir.is_dir():
-                    continue
-                
-                for html_file in company_dir.rglob('*.html'):
-                    # 跳过备份文件
-                    if html_file.suffix == '.bak':
-                        continue
-                    html_files.append(html_file)
-                for htm_file in company_dir.rglob('*.htm'):
-                    html_files.append(htm_file)
+        if not mapping:
+            logger.debug("no_images_for_html", path=relative_path)
+            return {}
         
-        if sample_size and len(html_files) > sample_size:
-            html_files = random.sample(html_files, sample_size)
+        logger.debug(
+            "image_mapping_found",
+            html_path=relative_path,
+            image_count=len(mapping)
+        )
         
-        print(f"✅ 找到 {len(html_files)} 个HTML文件")
-        return html_files
+        return mapping
     
-    def run(self, exchange: str = None, sample_size: int = None):
-        """运行修复"""
-        mode_str = "预览模式" if self.dry_run else "修复模式"
-        print("\n" + "=" * 100)
-        print(f"🔧 HTML图片链接修复工具 ({mode_str})")
-        print("=" * 100 + "\n")
-        
-        html_files = self.scan_html_files(exchange, sample_size)
-        
-        if not html_files:
-            print("❌ 没有找到HTML文件")
-            return
+    def build_src_index(self, image_mapping: Dict[str, str]) -> Dict[str, str]:
+        """
+        建立 文件名 -> 相对路径 的索引，使按文件名匹配为O(1)
+        URL中的文件名优先，其次是本地图片文件名
+        """
+        filename_index = {}
+        for url, relative_path in image_mapping.items():
+            filename_index.setdefault(url.rsplit('/', 1)[-1], relative_path)
+        for relative_path in image_mapping.values():
+            filename_index.setdefault(relative_path[2:], relative_path)
+        return filename_index
+    
+    def resolve_src(self, src: str, image_mapping: Dict[str, str], filename_index: Dict[str, str]) -> str:
+        """查找img src对应的本地相对路径，找不到返回None"""
+        if not src:
+            return None
         
-        self.stats['total_files'] = len(html_files)
+        # 直接匹配
+        if src in image_mapping:
+            return image_mapping[src]
         
-        print(f"\n开始处理 {len(html_files)} 个HTML文件...\n")
+        # 按文件名匹配
+        # file:///private/tmp/filings/NYSE/AB/2024/ab-20231231_g2.jpg -> ab-20231231_g2.jpg
+        src_filename = src.rsplit('/', 1)[-1]
+        if src_filename in filename_index:
+            return filename_index[src_filename]
         
-        fixed_files = []
+        # file:/// 路径兜底：在映射中查找包含此文件名的URL
+        if src.startswith('file:///') and src_filename:
+            for url, relative_path in image_mapping.items():
+                if src_filename in url or src_filename in relative_path:
+                    return relative_path
         
-        for i, html_path in enumerate(html_files, 1):
-            if i % 100 == 0:
-                print(f"  进度: {i}/{len(html_files)}")
-            
-            result = self.fix_html_file(html_path)
-            
-            if result['fixed']:
-                fixed_files.append(result)
-        
-        # 打印报告
-        self.print_report(fixed_files)
+        return None
+    
+    def record_change(self, result: Dict, src: str, new_src: str):
+        """记录一次链接替换"""
+        result['links_fixed'] += 1
+        result.setdefault('original_links', []).append(src)
+        result.setdefault('new_links', []).append(new_src)
+    
+    def on_file_fixed(self, result: Dict):
+        """文件写入完成后记录日志"""
+        logger.info(
+            "html_fixed",
+            path=result['path'],
+            links_fixed=result['links_fixed']
+        )
+    
+    def on_fix_error(self, result: Dict, error: Exception):
+        """处理出错时记录日志"""
+        logger.error("fix_failed", path=result['path'], error=str(error))
     
     def print_report(self, fixed_files: List[Dict]):
         """打印报告"""
@@ -294,7 +192,7 @@ class HTMLImageLinkFixer:
                 print(f"\n{i}. 文件: {result['path']}")
                 print(f"   修复链接数: {result['links_fixed']}")
                 
-                if result['original_links'] and result['new_links']:
+                if result.get('original_links'):
                     print(f"   示例:")
                     for orig, new in zip(result['original_links'][:2], result['new_links'][:2]):
                         print(f"     {orig[:80]}...")
@@ -315,7 +213,8 @@ class HTMLImageLinkFixer:
             print("   要实际修复，请去掉 --dry-run 参数。")
         elif self.stats['files_fixed'] > 0:
             print(f"🎉 修复完成！已修复 {self.stats['files_fixed']} 个文件。")
-            print("   原文件已备份为 .html.bak")
+            if self.backup:
+                print("   原文件已备份为 .html.bak 或 .htm.bak")
         else:
             print("✅ 所有文件都正常，无需修复。")
         
@@ -361,10 +260,34 @@ def main():
         help='预览模式，不实际修改文件'
     )
     
+    parser.add_argument(
+        '--no-backup',
+        dest='backup',
+        action='store_false',
+        help='不备份原文件（默认修改前备份为 .bak，硬链接，不占额外空间）'
+    )
+    
+    parser.add_argument(
+        '--strict',
+        action='store_true',
+        help='使用BeautifulSoup完整解析HTML（较慢，用于格式异常的文件）'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='并行处理的进程数（默认：CPU核数）'
+    )
+    
     args = parser.parse_args()
     
     # 运行修复
-    fixer = HTMLImageLinkFixer(dry_run=args.dry_run)
+    fixer = HTMLImageLinkFixer(
+        dry_run=args.dry_run,
+        backup=args.backup,
+        strict=args.strict,
+        workers=args.workers
+    )
     fixer.run(
         exchange=args.exchange,
         sample_size=args.sample
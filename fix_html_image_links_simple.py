@@ -6,34 +6,60 @@
   python fix_html_image_links_simple.py                   # 修复所有HTML文件
   python fix_html_image_links_simple.py --sample 50       # 随机抽样50个文件
   python fix_html_image_links_simple.py --dry-run         # 预览模式，不实际修改
+  python fix_html_image_links_simple.py --no-backup       # 不备份原文件（默认备份为 .bak）
 """
 
 import argparse
+import os
 import re
 import sys
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List
-import random
 
-from bs4 import BeautifulSoup
-from config.settings import settings
+from services.html_image_links import HTMLImageLinkFixerBase
 
 
-class HTMLImageLinkFixerSimple:
+# 视为图片的文件扩展名
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.gif', '.svg')
+
+# 本地图片文件名中的序号，如 ab-20231231_image-001
+IMAGE_SEQ_RE = re.compile(r'_image-(\d+)')
+
+
+@lru_cache(maxsize=4096)
+def _list_dir_images(dir_path: str) -> tuple:
+    """
+    列出目录下的图片文件，按目录缓存（同目录的多个HTML只扫描一次）
+    
+    Returns:
+        ((文件名, 主文件名, 扩展名, _image-序号或None), ...)
+    """
+    images = []
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            
+            stem, suffix = os.path.splitext(entry.name)
+            if suffix.lower() not in IMAGE_SUFFIXES:
+                continue
+            
+            match = IMAGE_SEQ_RE.search(stem)
+            images.append((entry.name, stem, suffix, int(match.group(1)) if match else None))
+    return tuple(images)
+
+
+class HTMLImageLinkFixerSimple(HTMLImageLinkFixerBase):
     """HTML图片链接修复器（简化版）"""
     
-    def __init__(self, dry_run: bool = False, verbose: bool = False):
-        self.storage_root = Path(settings.storage_root)
-        self.dry_run = dry_run
+    def __init__(self, dry_run: bool = False, verbose: bool = False, strict: bool = False,
+                 backup: bool = True, workers: int = None):
+        super().__init__(dry_run=dry_run, strict=strict, backup=backup, workers=workers)
         self.verbose = verbose
         
-        # 统计数据
-        self.stats = {
-            'total_files': 0,
-            'files_fixed': 0,
-            'links_fixed': 0,
-            'errors': 0
-        }
+        # 逐个文件输出时不再按时间输出进度
+        self.show_progress = not verbose
     
     def find_local_images(self, html_path: Path) -> Dict[str, str]:
         """
@@ -44,212 +70,107 @@ class HTMLImageLinkFixerSimple:
         Images: NYSE/AB/2024/ab-20231231_image-001.jpg
                 NYSE/AB/2024/ab-20231231_image-002.png
         """
-        html_dir = html_path.parent
         html_stem = html_path.stem  # 文件名不含扩展名
         
         # 查找同目录下符合命名规则的图片
         mapping = {}
         
-        for img_file in html_dir.iterdir():
-            if not img_file.is_file():
-                continue
-            
-            # 检查是否是图片文件
-            if img_file.suffix.lower() not in ['.jpg', '.jpeg', '.png', '.gif', '.svg']:
-                continue
-            
+        for name, stem, suffix, seq in _list_dir_images(str(html_path.parent)):
             # 检查是否与HTML文件相关
             # 图片名应该以HTML文件名开头
-            if img_file.stem.startswith(html_stem):
+            if stem.startswith(html_stem):
                 # 相对路径
-                relative_path = f"./{img_file.name}"
+                relative_path = f"./{name}"
                 
                 # 尝试匹配可能的原始文件名
                 # 从 ab-20231231_image-001.jpg 提取 可能的原始名称
                 # 原始名称可能是 ab-20231231_g1.jpg, g1.jpg 等
                 
                 # 添加映射：原始文件名 -> 相对路径
-                mapping[img_file.name] = relative_path
+                mapping[name] = relative_path
                 
                 # 如果有_image-XXX模式，尝试推断原始名称
-                match = re.search(r'_image-(\d+)', img_file.stem)
-                if match:
-                    seq = int(match.group(1))
+                if seq is not None:
                     # 可能的原始名称模式
                     possible_names = [
-                        f"g{seq}{img_file.suffix}",  # g1.jpg
-                        f"{html_stem}_g{seq}{img_file.suffix}",  # ab-20231231_g1.jpg
-                        f"image{seq:02d}{img_file.suffix}",  # image01.jpg
-                        f"img{seq}{img_file.suffix}",  # img1.jpg
+                        f"g{seq}{suffix}",  # g1.jpg
+                        f"{html_stem}_g{seq}{suffix}",  # ab-20231231_g1.jpg
+                        f"image{seq:02d}{suffix}",  # image01.jpg
+                        f"img{seq}{suffix}",  # img1.jpg
                     ]
-                    for name in possible_names:
-                        mapping[name] = relative_path
+                    for possible_name in possible_names:
+                        mapping[possible_name] = relative_path
         
         return mapping
     
-    def fix_html_file(self, html_path: Path) -> Dict:
-        """修复单个HTML文件"""
-        result = {
-            'path': str(html_path.relative_to(self.storage_root)),
-            'fixed': False,
-            'links_fixed': 0,
-            'changes': []
-        }
+    def get_image_mapping(self, html_path: Path, result: Dict) -> Dict[str, str]:
+        """获取本地图片映射"""
+        image_mapping = self.find_local_images(html_path)
         
-        try:
-            # 读取HTML文件
-            with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
-                original_content = f.read()
-            
-            # 获取本地图片映射
-            image_mapping = self.find_local_images(html_path)
-            
-            if not image_mapping:
-                if self.verbose:
-                    print(f"  ℹ️  {result['path']}: 没有找到关联的图片文件")
-                return result
-            
-            if self.verbose:
-                print(f"  📝 {result['path']}: 找到 {len(image_mapping)} 个可能的图片映射")
-            
-            # 解析HTML
-            soup = BeautifulSoup(original_content, 'lxml')
-            img_tags = soup.find_all('img')
-            
-            if not img_tags:
-                return result
-            
-            modified = False
-            
-            for img in img_tags:
-                src = img.get('src', '')
-                
-                if not src:
-                    continue
-                
-                # 如果已经是正确的相对路径，跳过
-                if src.startswith('./') and src[2:] in [v[2:] for v in image_mapping.values()]:
-                    continue
-                
-                # 提取文件名
-                src_filename = Path(src).name
-                
-                # 尝试在映射中查找
-                new_src = image_mapping.get(src_filename)
-                
-                # 如果找不到，尝试模糊匹配
-                if not new_src:
-                    for key, value in image_mapping.items():
-                        if src_filename in key or key in src_filename:
-                            new_src = value
-                            break
-                
-                # 如果找到了新的相对路径，并且与原来不同
-                if new_src and new_src != src:
-                    old_src = src[:100] + '...' if len(src) > 100 else src
-                    img['src'] = new_src
-                    modified = True
-                    result['links_fixed'] += 1
-                    result['changes'].append({
-                        'old': old_src,
-                        'new': new_src
-                    })
-            
-            if modified:
-                if not self.dry_run:
-                    # 保存修改后的HTML
-                    new_content = str(soup)
-                    
-                    # 备份原文件
-                    backup_path = html_path.with_suffix(html_path.suffix + '.bak')
-                    if not backup_path.exists():
-                        with open(backup_path, 'w', encoding='utf-8') as f:
-                            f.write(original_content)
-                    
-                    # 写入新内容
-                    with open(html_path, 'w', encoding='utf-8') as f:
-                        f.write(new_content)
-                    
-                    if self.verbose:
-                        print(f"  ✅ {result['path']}: 修复了 {result['links_fixed']} 个链接")
-                
-                result['fixed'] = True
-                self.stats['files_fixed'] += 1
-                self.stats['links_fixed'] += result['links_fixed']
-            
-            return result
-            
-        except Exception as e:
-            result['error'] = str(e)
-            self.stats['errors'] += 1
+        if not image_mapping:
             if self.verbose:
-                print(f"  ❌ {result['path']}: 错误 - {str(e)}")
-            return result
-    
-    def scan_html_files(self, exchange: str = None, sample_size: int = None) -> List[Path]:
-        """扫描HTML文件"""
-        print(f"📁 扫描HTML文件...")
-        
-        if not self.storage_root.exists():
-            print(f"⚠️  存储目录不存在: {self.storage_root}")
-            return []
-        
-        html_files = []
-        
-        for exchange_dir in self.storage_root.iterdir():
-            if not exchange_dir.is_dir():
-                continue
-            
-            if exchange and exchange_dir.name != exchange:
-                continue
-            
-            for company_dir in exchange_dir.iterdir():
-                if not company_dir.is_dir():
-                    continue
-                
-                for html_file in company_dir.rglob('*.html'):
-                    if '.bak' not in html_file.name:
-                        html_files.append(html_file)
-                for htm_file in company_dir.rglob('*.htm'):
-                    if '.bak' not in htm_file.name:
-                        html_files.append(htm_file)
+                print(f"  ℹ️  {result['path']}: 没有找到关联的图片文件")
+            return {}
         
-        if sample_size and len(html_files) > sample_size:
-            html_files = random.sample(html_files, sample_size)
+        if self.verbose:
+            print(f"  📝 {result['path']}: 找到 {len(image_mapping)} 个可能的图片映射")
         
-        print(f"✅ 找到 {len(html_files)} 个HTML文件\n")
-        return html_files
+        return image_mapping
     
-    def run(self, exchange: str = None, sample_size: int = None):
-        """运行修复"""
-        mode_str = "预览模式" if self.dry_run else "修复模式"
-        print("\n" + "=" * 100)
-        print(f"🔧 HTML图片链接修复工具 ({mode_str})")
-        print("=" * 100 + "\n")
-        
-        html_files = self.scan_html_files(exchange, sample_size)
-        
-        if not html_files:
-            print("❌ 没有找到HTML文件")
-            return
+    def build_src_index(self, image_mapping: Dict[str, str]) -> set:
+        """已有的本地图片文件名，每个文件只计算一次"""
+        return {v[2:] for v in image_mapping.values()}
+    
+    def resolve_src(self, src: str, image_mapping: Dict[str, str], local_names: set) -> str:
+        """查找img src对应的本地相对路径，找不到或无需修改时返回None"""
+        if not src:
+            return None
         
-        self.stats['total_files'] = len(html_files)
+        # 如果已经是正确的相对路径，跳过
+        if src.startswith('./') and src[2:] in local_names:
+            return None
         
-        print(f"开始处理 {len(html_files)} 个HTML文件...\n")
+        # 提取文件名
+        src_filename = src.rsplit('/', 1)[-1]
         
-        fixed_files = []
+        # 尝试在映射中查找
+        new_src = image_mapping.get(src_filename)
         
-        for i, html_path in enumerate(html_files, 1):
-            if not self.verbose and i % 50 == 0:
-                print(f"  进度: {i}/{len(html_files)}")
-            
-            result = self.fix_html_file(html_path)
-            
-            if result['fixed']:
-                fixed_files.append(result)
+        # 如果找不到，尝试模糊匹配
+        if not new_src:
+            for key, value in image_mapping.items():
+                if src_filename in key or key in src_filename:
+                    new_src = value
+                    break
         
-        # 打印报告
-        self.print_report(fixed_files)
+        return new_src
+    
+    def record_change(self, result: Dict, src: str, new_src: str):
+        """记录一次链接替换"""
+        old_src = src[:100] + '...' if len(src) > 100 else src
+        result['links_fixed'] += 1
+        result.setdefault('changes', []).append({
+            'old': old_src,
+            'new': new_src
+        })
+    
+    def on_file_fixed(self, result: Dict):
+        """文件写入完成后输出结果"""
+        if self.verbose:
+            print(f"  ✅ {result['path']}: 修复了 {result['links_fixed']} 个链接")
+    
+    def on_fix_error(self, result: Dict, error: Exception):
+        """处理出错时输出错误"""
+        if self.verbose:
+            print(f"  ❌ {result['path']}: 错误 - {str(error)}")
+    
+    def update_stats(self, result: Dict):
+        """汇总单个文件的处理结果（在主进程中调用），预览模式也计入"将被修复"的文件"""
+        if 'error' in result:
+            self.stats['errors'] += 1
+        elif result['fixed']:
+            self.stats['files_fixed'] += 1
+            self.stats['links_fixed'] += result['links_fixed']
     
     def print_report(self, fixed_files: List[Dict]):
         """打印报告"""
@@ -273,7 +194,7 @@ class HTMLImageLinkFixerSimple:
                 print(f"\n{i}. 文件: {result['path']}")
                 print(f"   修复链接数: {result['links_fixed']}")
                 
-                if result['changes']:
+                if result.get('changes'):
                     print(f"   示例:")
                     for change in result['changes'][:2]:
                         print(f"     {change['old']}")
@@ -294,7 +215,8 @@ class HTMLImageLinkFixerSimple:
             print("   要实际修复，请去掉 --dry-run 参数。")
         elif self.stats['files_fixed'] > 0:
             print(f"🎉 修复完成！已修复 {self.stats['files_fixed']} 个文件。")
-            print("   原文件已备份为 .html.bak 或 .htm.bak")
+            if self.backup:
+                print("   原文件已备份为 .html.bak 或 .htm.bak")
         else:
             print("✅ 所有文件都正常，无需修复。")
         
@@ -340,16 +262,41 @@ def main():
         help='预览模式，不实际修改文件'
     )
     
+    parser.add_argument(
+        '--no-backup',
+        dest='backup',
+        action='store_false',
+        help='不备份原文件（默认修改前备份为 .bak，硬链接，不占额外空间）'
+    )
+    
     parser.add_argument(
         '--verbose',
         action='store_true',
         help='显示详细信息'
     )
     
+    parser.add_argument(
+        '--strict',
+        action='store_true',
+        help='使用BeautifulSoup完整解析HTML（较慢，用于格式异常的文件）'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='并行处理的进程数（默认：CPU核数）'
+    )
+    
     args = parser.parse_args()
     
     # 运行修复
-    fixer = HTMLImageLinkFixerSimple(dry_run=args.dry_run, verbose=args.verbose)
+    fixer = HTMLImageLinkFixerSimple(
+        dry_run=args.dry_run,
+        backup=args.backup,
+        verbose=args.verbose,
+        strict=args.strict,
+        workers=args.workers
+    )
     fixer.run(
         exchange=args.exchange,
         sample_size=args.sample
@@ -64,6 +64,18 @@ def init_database():
     migration_path = "migrations/007_fix_sha256_constraint.sql"
     execute_schema_file(migration_path)
 
+    # Execute filings (company_id, filing_date) index
+    migration_path = "migrations/008_add_filings_company_date_index.sql"
+    execute_schema_file(migration_path)
+
+    # Execute active companies export index
+    migration_path = "migrations/009_add_companies_active_export_index.sql"
+    execute_schema_file(migration_path)
+
+    # Execute artifacts sha256 dedup index
+    migration_path = "migrations/010_add_artifacts_sha256_dedup_index.sql"
+    execute_schema_file(migration_path)
+
     logger.info("database_initialized")
 
 
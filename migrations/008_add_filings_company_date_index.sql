@@ -0,0 +1,8 @@
+-- Migration 008: 添加 filings(company_id, filing_date) 复合索引
+--
+-- 用途：export_companies.py 通过相关子查询取每家公司最早的 filing_date，
+-- 该索引使 MIN(filing_date) 可直接由索引首项得到，无需扫描公司的全部 filings
+--
+-- Date: 2025-11-05
+
+CREATE INDEX IF NOT EXISTS idx_filings_company_date ON filings(company_id, filing_date);
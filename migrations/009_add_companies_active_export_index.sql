@@ -0,0 +1,13 @@
+-- Migration 009: 添加活跃公司 (exchange, ticker) 部分覆盖索引
+--
+-- 用途：export_companies.py 按 is_active = true 过滤并 ORDER BY exchange, ticker，
+-- 该部分索引同时满足过滤条件和排序，INCLUDE 列使查询可走 Index Only Scan，无需全表扫描和排序
+--
+-- 注意：execute_schema_file 在事务中执行，不能使用 CREATE INDEX CONCURRENTLY；
+-- 大表上线时可手动用 psql 执行 CONCURRENTLY 版本
+--
+-- Date: 2025-11-05
+
+CREATE INDEX IF NOT EXISTS idx_companies_active_exchange_ticker
+    ON companies(exchange, ticker) INCLUDE (company_name, id)
+    WHERE is_active = true;
@@ -0,0 +1,21 @@
+-- Migration 010: 添加 artifacts (sha256, created_at DESC, id DESC) 部分复合索引
+--
+-- 用途：fix_duplicate_sha256.py 选出每个 sha256 要保留的记录（create_keeper_table）：
+--   SELECT DISTINCT ON (sha256) id, sha256 FROM artifacts
+--   WHERE sha256 IS NOT NULL AND id <= :max_id
+--   ORDER BY sha256, created_at DESC, id DESC
+-- 已有的 idx_artifacts_sha256 只有 sha256 一列，无法提供 (created_at DESC, id DESC) 的组内顺序，
+-- 这条查询只能对所有带 sha256 的记录整体排序（大表上会落盘外排）；本索引的键顺序与
+-- ORDER BY 完全一致且包含查询用到的全部列，可按索引顺序 Index Only Scan 直接取每组第一条，不再排序
+--
+-- 重复检测（GROUP BY sha256 HAVING COUNT(*) > 1）和按 sha256 的等值查找用 idx_artifacts_sha256 已足够，
+-- 本索引不是为它们添加的
+--
+-- 注意：execute_schema_file 在事务中执行，不能使用 CREATE INDEX CONCURRENTLY；
+-- 大表上线时可手动用 psql 执行 CONCURRENTLY 版本
+--
+-- Date: 2025-11-05
+
+CREATE INDEX IF NOT EXISTS idx_artifacts_sha256_dedup
+    ON artifacts(sha256, created_at DESC, id DESC)
+    WHERE sha256 IS NOT NULL;
@@ -19,6 +19,7 @@ CREATE TABLE IF NOT EXISTS companies (
 CREATE INDEX IF NOT EXISTS idx_companies_cik ON companies(cik);
 CREATE INDEX IF NOT EXISTS idx_companies_ticker ON companies(ticker);
 CREATE INDEX IF NOT EXISTS idx_companies_exchange ON companies(exchange) WHERE is_active = true;
+CREATE INDEX IF NOT EXISTS idx_companies_active_exchange_ticker ON companies(exchange, ticker) INCLUDE (company_name, id) WHERE is_active = true;
 
 -- Filings metadata (immutable once filed)
 CREATE TABLE IF NOT EXISTS filings (
@@ -41,6 +42,7 @@ CREATE TABLE IF NOT EXISTS filings (
 
 CREATE INDEX IF NOT EXISTS idx_filings_company ON filings(company_id);
 CREATE INDEX IF NOT EXISTS idx_filings_date ON filings(filing_date);
+CREATE INDEX IF NOT EXISTS idx_filings_company_date ON filings(company_id, filing_date);
 CREATE INDEX IF NOT EXISTS idx_filings_form_year ON filings(form_type, fiscal_year);
 CREATE INDEX IF NOT EXISTS idx_filings_accession ON filings(accession_number);
 CREATE INDEX IF NOT EXISTS idx_filings_amendments ON filings(amends_accession) WHERE amends_accession IS NOT NULL;
@@ -71,6 +73,10 @@ CREATE INDEX IF NOT EXISTS idx_artifacts_retry ON artifacts(retry_count, status)
     WHERE status = 'failed' AND retry_count < max_retries;
 -- SHA256索引用于内容查找和复用，但不强制唯一（不同报告可能引用相同图片）
 CREATE INDEX IF NOT EXISTS idx_artifacts_sha256 ON artifacts(sha256) WHERE sha256 IS NOT NULL;
+-- 去重索引：fix_duplicate_sha256.py 选保留记录的 DISTINCT ON (sha256) ... ORDER BY sha256, created_at DESC, id DESC
+-- 按此索引顺序扫描即可，无需对全部记录排序（idx_artifacts_sha256 不提供组内顺序）
+CREATE INDEX IF NOT EXISTS idx_artifacts_sha256_dedup ON artifacts(sha256, created_at DESC, id DESC)
+    WHERE sha256 IS NOT NULL;
 -- 唯一约束：同一报告的同一URL只下载一次
 CREATE UNIQUE INDEX IF NOT EXISTS idx_artifacts_filing_url_unique ON artifacts(filing_id, url);
 
@@ -6,7 +6,7 @@ from typing import List
 
 from sqlalchemy import (
     Boolean, Column, Date, DateTime, ForeignKey, Integer,
-    String, Text, BigInteger, Numeric, Index, UniqueConstraint
+    String, Text, BigInteger, Numeric, Index, UniqueConstraint, text
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
@@ -36,6 +36,11 @@ class Company(Base):
         Index('idx_companies_cik', 'cik'),
         Index('idx_companies_ticker', 'ticker'),
         Index('idx_companies_status', 'status'),
+        Index(
+            'idx_companies_active_exchange_ticker', 'exchange', 'ticker',
+            postgresql_include=['company_name', 'id'],
+            postgresql_where=text('is_active = true'),
+        ),
     )
 
 
@@ -86,6 +91,7 @@ class Filing(Base):
     __table_args__ = (
         Index('idx_filings_company', 'company_id'),
         Index('idx_filings_date', 'filing_date'),
+        Index('idx_filings_company_date', 'company_id', 'filing_date'),
         Index('idx_filings_form_year', 'form_type', 'fiscal_year'),
         Index('idx_filings_accession', 'accession_number'),
     )
@@ -121,6 +127,10 @@ class Artifact(Base):
         Index('idx_artifacts_filing', 'filing_id'),
         Index('idx_artifacts_status', 'status'),
         Index('idx_artifacts_sha256', 'sha256'),
+        Index(
+            'idx_artifacts_sha256_dedup', sha256, created_at.desc(), id.desc(),
+            postgresql_where=text('sha256 IS NOT NULL'),
+        ),
     )
 
 
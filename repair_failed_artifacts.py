@@ -7,6 +7,7 @@ import argparse
 from typing import Tuple, Optional, List
 
 import structlog
+from sqlalchemy import func
 
 from config.db import get_db_session
 from config.settings import settings
@@ -17,24 +18,18 @@ logger = structlog.get_logger()
 
 def _counts(session, exchanges: Optional[List[str]], max_retry: int) -> Tuple[int, int]:
     """Return total failed artifacts and how many exceeded retry limit."""
-    query = session.query(Artifact).join(Filing).join(Company).filter(
+    # Both counts come from a single scan of the failed artifacts
+    query = session.query(
+        func.count(Artifact.id),
+        func.count(Artifact.id).filter(Artifact.retry_count >= max_retry)
+    ).select_from(Artifact).join(Filing).join(Company).filter(
         Artifact.status == 'failed'
     )
 
     if exchanges:
         query = query.filter(Company.exchange.in_(exchanges))
 
-    total_failed = query.count()
-
-    query_skipped = session.query(Artifact).join(Filing).join(Company).filter(
-        Artifact.status == 'failed',
-        Artifact.retry_count >= max_retry
-    )
-
-    if exchanges:
-        query_skipped = query_skipped.filter(Company.exchange.in_(exchanges))
-
-    skipped = query_skipped.count()
+    total_failed, skipped = query.one()
 
     return total_failed, skipped
 
@@ -0,0 +1,70 @@
+"""
+Batched persistence of artifact download results.
+Shared by the download scripts so results are written back with one
+statement per batch instead of one commit per artifact.
+"""
+import structlog
+from sqlalchemy import update
+
+from config.db import get_db_session
+from models import Artifact
+
+logger = structlog.get_logger()
+
+# Artifact columns written back by the batched UPDATE
+RESULT_COLUMNS = (
+    'status', 'error_message', 'retry_count', 'file_size', 'sha256',
+    'local_path', 'last_attempt_at', 'downloaded_at'
+)
+
+
+def flush_download_results(rows):
+    """
+    Persist a batch of download results with one UPDATE and one commit.
+
+    Args:
+        rows: List of dicts with 'id' plus RESULT_COLUMNS values
+    """
+    if not rows:
+        return
+
+    with get_db_session() as session:
+        session.execute(update(Artifact), rows)
+
+    logger.debug("download_results_flushed", count=len(rows))
+
+
+def copy_download_results(rows):
+    """
+    Persist a batch of download results via COPY into a staging table.
+
+    The rows are streamed with COPY FROM STDIN into a temp table that is
+    dropped on commit, then applied to artifacts with one UPDATE ... FROM.
+    This avoids per-row bind/parse cost for very large runs.
+
+    Args:
+        rows: List of dicts with 'id' plus RESULT_COLUMNS values
+    """
+    if not rows:
+        return
+
+    columns = ('id',) + RESULT_COLUMNS
+    column_list = ', '.join(columns)
+    assignments = ', '.join(f"{c} = d.{c}" for c in RESULT_COLUMNS)
+
+    with get_db_session() as session:
+        dbapi_conn = session.connection().connection
+        with dbapi_conn.cursor() as cur:
+            cur.execute(
+                f"CREATE TEMP TABLE download_results ON COMMIT DROP AS "
+                f"SELECT {column_list} FROM artifacts WITH NO DATA"
+            )
+            with cur.copy(f"COPY download_results ({column_list}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(tuple(row[c] for c in columns))
+            cur.execute(
+                f"UPDATE artifacts a SET {assignments} "
+                f"FROM download_results d WHERE a.id = d.id"
+            )
+
+    logger.debug("download_results_copied", count=len(rows))
@@ -3,6 +3,7 @@ Artifact downloader service.
 Handles downloading HTML, images, and XBRL files with deduplication.
 """
 import re
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional, Tuple
@@ -24,6 +25,9 @@ logger = structlog.get_logger()
 # SEC base URL for resolving relative URLs
 SEC_BASE_URL = "https://www.sec.gov"
 
+# Initial backoff (seconds) before retrying a request rejected with HTTP 429
+RATE_LIMIT_BACKOFF = 1.0
+
 
 def extract_image_urls(html_bytes: bytes) -> List[str]:
     """
@@ -200,11 +204,40 @@ class ArtifactDownloader:
             )
             return None
 
+    def _get_with_rate_limit_retries(self, artifact: Artifact, retries: int) -> httpx.Response:
+        """
+        GET the artifact URL, retrying responses with status 429.
+        
+        Returns:
+            The last response; the caller checks its status
+        """
+        delay = RATE_LIMIT_BACKOFF
+        for attempt in range(retries + 1):
+            response = httpx.get(
+                artifact.url,
+                headers={"User-Agent": settings.sec_user_agent},
+                timeout=settings.sec_timeout,
+                follow_redirects=True
+            )
+            if response.status_code != 429 or attempt == retries:
+                return response
+            
+            logger.warning(
+                "artifact_rate_limited",
+                artifact_id=artifact.id,
+                attempt=attempt + 1,
+                delay=delay
+            )
+            time.sleep(delay)
+            delay *= 2
+    
     def download_artifact(
         self,
         session: Session,
         artifact: Artifact,
-        execution_run_id: Optional[int] = None
+        execution_run_id: Optional[int] = None,
+        commit: bool = True,
+        rate_limit_retries: int = 0
     ) -> bool:
         """
         Download a single artifact.
@@ -213,22 +246,23 @@ class ArtifactDownloader:
             session: Database session
             artifact: Artifact object to download
             execution_run_id: Current execution run ID for error logging
+            commit: Commit after each state change. Pass False when the
+                caller persists the artifact row itself (e.g. in batches).
+            rate_limit_retries: Extra attempts, with exponential backoff, when
+                the response status is 429. The failure is only recorded
+                (retry_count, ErrorLog) once the attempts are exhausted.
         
         Returns:
             Success boolean
         """
         artifact.last_attempt_at = datetime.utcnow()
         artifact.status = 'downloading'
-        session.commit()
+        if commit:
+            session.commit()
         
         try:
             # Download file content
-            response = httpx.get(
-                artifact.url,
-                headers={"User-Agent": settings.sec_user_agent},
-                timeout=settings.sec_timeout,
-                follow_redirects=True
-            )
+            response = self._get_with_rate_limit_retries(artifact, rate_limit_retries)
             response.raise_for_status()
             
             content = response.content
@@ -355,7 +389,8 @@ class ArtifactDownloader:
                 else:
                     logger.debug("no_images_in_html", artifact_id=artifact.id)
 
-            session.commit()
+            if commit:
+                session.commit()
             logger.info("artifact_downloaded", artifact_id=artifact.id, status=artifact.status)
             return True
             
@@ -374,7 +409,8 @@ class ArtifactDownloader:
                 occurred_at=datetime.utcnow()
             )
             session.add(error_log)
-            session.commit()
+            if commit:
+                session.commit()
             
             logger.error(
                 "artifact_download_failed",
@@ -0,0 +1,351 @@
+"""
+HTML图片链接修复的公共部分
+fix_html_image_links.py 与 fix_html_image_links_simple.py 共用：
+文件扫描/抽样、img src 字节级改写、原子写入、多进程执行
+
+两个脚本只各自实现"图片映射从哪里来、src 如何匹配"的策略
+（HTMLImageLinkFixerBase 的 get_image_mapping / build_src_index / resolve_src）
+"""
+
+import html
+import os
+import random
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# 匹配 <img ... src="..."> 的 src 属性（字节级扫描，无需构建/序列化 DOM）
+# src 前不能是字母数字或连字符，避免误匹配 data-src 等属性
+IMG_SRC_RE = re.compile(rb'(<img\b[^>]*?(?<![\w-])src\s*=\s*)(["\'])(.*?)\2', re.IGNORECASE)
+
+# 快速判断文件中是否有<img>标签（大小写不敏感）
+IMG_TAG_RE = re.compile(rb'<img\b', re.IGNORECASE)
+
+# 进度输出的最小间隔（秒），按时间限频而不是按文件数
+PROGRESS_INTERVAL = 5.0
+
+# 每个工作进程一次处理的文件数，减少进程间通信次数
+FIX_CHUNK_SIZE = 32
+
+# 工作进程内的修复器实例（由 _init_worker 在进程启动时设置一次）
+_worker_fixer = None
+
+
+def iter_html_files(path: str) -> Iterator[str]:
+    """递归遍历目录，逐个产出HTML文件路径（os.scandir 自带文件类型，无需额外 stat）"""
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_html_files(entry.path)
+            elif entry.name.endswith(('.html', '.htm')) and '.bak' not in entry.name:
+                yield entry.path
+
+
+def reservoir_sample(items, k: int) -> list:
+    """蓄水池抽样：单次遍历从任意长度的序列中等概率抽取k个元素"""
+    sample = []
+    for i, item in enumerate(items):
+        if i < k:
+            sample.append(item)
+        else:
+            j = random.randrange(i + 1)
+            if j < k:
+                sample[j] = item
+    return sample
+
+
+def patch_src_bytes(data: bytes, replacements: Dict[str, str]) -> tuple:
+    """
+    按字节偏移原地替换img src的值，文档其余部分保持原样，无需重新序列化
+    
+    Returns:
+        (替换后的内容, 替换次数)
+    """
+    patches = []
+    for match in IMG_SRC_RE.finditer(data):
+        src = html.unescape(match.group(3).decode('utf-8', errors='ignore'))
+        new_src = replacements.get(src)
+        if new_src is not None:
+            patches.append((match.start(3), match.end(3), new_src.encode('utf-8')))
+    
+    patched = bytearray(data)
+    for start, end, new_src in reversed(patches):
+        patched[start:end] = new_src
+    return bytes(patched), len(patches)
+
+
+def write_html_atomic(html_path: Path, data: bytes, backup: bool = True):
+    """
+    原子写入修复后的HTML：先写临时文件再 os.replace，中途失败不会留下写了一半的文件
+    
+    Args:
+        html_path: 要覆盖的HTML文件
+        data: 新内容
+        backup: 是否先将原文件备份为 <文件名>.bak
+    """
+    # 备份：硬链接到原inode，不复制内容；已有备份时保留旧备份
+    # 替换后原路径指向新inode，硬链接备份保持原内容
+    if backup:
+        backup_path = html_path.with_suffix(html_path.suffix + '.bak')
+        try:
+            os.link(html_path, backup_path)
+        except FileExistsError:
+            pass
+    
+    # 临时文件沿用原文件的权限位，替换后文件权限不变
+    tmp_path = html_path.with_suffix(html_path.suffix + '.tmp')
+    tmp_path.write_bytes(data)
+    shutil.copymode(html_path, tmp_path)
+    os.replace(tmp_path, html_path)
+
+
+def _init_worker(fixer):
+    """工作进程初始化：保存修复器实例"""
+    global _worker_fixer
+    _worker_fixer = fixer
+
+
+def _fix_in_worker(html_path: Path) -> Dict:
+    """在工作进程中修复单个HTML文件"""
+    return _worker_fixer.fix_html_file(html_path)
+
+
+class HTMLImageLinkFixerBase:
+    """
+    HTML图片链接修复器基类
+    
+    子类实现映射策略：get_image_mapping、build_src_index、resolve_src，
+    以及 record_change / print_report 等报告细节
+    """
+    
+    def __init__(self, dry_run: bool = False, strict: bool = False, backup: bool = True,
+                 workers: int = None):
+        # 配置延迟导入，--help 等短流程无需承担导入开销
+        from config.settings import settings
+        
+        self.storage_root = Path(settings.storage_root)
+        self.dry_run = dry_run
+        self.backup = backup
+        self.strict = strict
+        self.workers = workers or os.cpu_count() or 1
+        
+        # 是否按时间输出处理进度
+        self.show_progress = True
+        
+        # 统计数据
+        self.stats = {
+            'total_files': 0,
+            'files_fixed': 0,
+            'links_fixed': 0,
+            'errors': 0
+        }
+    
+    # ---- 子类实现的策略 ----
+    
+    def get_image_mapping(self, html_path: Path, result: Dict) -> Dict[str, str]:
+        """返回该HTML文件的 {原始src或文件名: 相对路径} 映射"""
+        raise NotImplementedError
+    
+    def build_src_index(self, image_mapping: Dict[str, str]):
+        """每个文件预先计算一次的辅助索引，传给 resolve_src"""
+        return None
+    
+    def resolve_src(self, src: str, image_mapping: Dict[str, str], index) -> Optional[str]:
+        """查找img src对应的本地相对路径，找不到或无需修改时返回None"""
+        raise NotImplementedError
+    
+    def record_change(self, result: Dict, src: str, new_src: str):
+        """记录一次链接替换"""
+        result['links_fixed'] += 1
+    
+    def prepare(self):
+        """开始处理文件前的准备（如加载映射），在主进程中调用一次"""
+    
+    def on_file_fixed(self, result: Dict):
+        """文件写入完成后的回调"""
+    
+    def on_fix_error(self, result: Dict, error: Exception):
+        """处理单个文件出错时的回调"""
+    
+    def print_report(self, fixed_files: List[Dict]):
+        """打印报告"""
+        raise NotImplementedError
+    
+    # ---- 公共流程 ----
+    
+    def rewrite_with_regex(self, data: bytes, image_mapping: Dict[str, str], result: Dict) -> bytes:
+        """用正则直接替换img src，未匹配的标签原样保留"""
+        index = self.build_src_index(image_mapping)
+        
+        def repl(match):
+            src = html.unescape(match.group(3).decode('utf-8', errors='ignore'))
+            new_src = self.resolve_src(src, image_mapping, index)
+            
+            if not new_src or new_src == src:
+                return match.group(0)
+            
+            self.record_change(result, src, new_src)
+            quote = match.group(2)
+            return match.group(1) + quote + new_src.encode('utf-8') + quote
+        
+        return IMG_SRC_RE.sub(repl, data)
+    
+    def rewrite_with_soup(self, data: bytes, image_mapping: Dict[str, str], result: Dict) -> bytes:
+        """用BeautifulSoup解析确定要替换的img src，再按字节偏移回写（--strict模式）"""
+        # 只有 --strict 模式需要 BeautifulSoup/lxml，按需导入
+        from bs4 import BeautifulSoup
+        
+        soup = BeautifulSoup(data.decode('utf-8', errors='ignore'), 'lxml')
+        index = self.build_src_index(image_mapping)
+        replacements = {}
+        replaced_count = 0
+        
+        for img in soup.find_all('img'):
+            src = img.get('src', '')
+            new_src = self.resolve_src(src, image_mapping, index)
+            
+            # 如果找到了新的相对路径，并且与原来不同
+            if new_src and new_src != src:
+                img['src'] = new_src
+                replacements[src] = new_src
+                replaced_count += 1
+                self.record_change(result, src, new_src)
+        
+        if not replacements:
+            return data
+        
+        # 只回写改动的src；若有src未被正则定位到（如未加引号的属性），才整体序列化
+        new_data, patched_count = patch_src_bytes(data, replacements)
+        if patched_count < replaced_count:
+            return str(soup).encode('utf-8')
+        return new_data
+    
+    def fix_html_file(self, html_path: Path) -> Dict:
+        """修复单个HTML文件"""
+        result = {
+            'path': str(html_path.relative_to(self.storage_root)),
+            'fixed': False,
+            'links_fixed': 0
+        }
+        
+        try:
+            # 读取HTML文件
+            original_data = html_path.read_bytes()
+            
+            # 没有<img>标签的文件无需处理，跳过映射查找和解析
+            if not IMG_TAG_RE.search(original_data):
+                return result
+            
+            image_mapping = self.get_image_mapping(html_path, result)
+            if not image_mapping:
+                return result
+            
+            if self.strict:
+                new_data = self.rewrite_with_soup(original_data, image_mapping, result)
+            else:
+                new_data = self.rewrite_with_regex(original_data, image_mapping, result)
+            
+            if result['links_fixed'] > 0:
+                if not self.dry_run:
+                    write_html_atomic(html_path, new_data, backup=self.backup)
+                    self.on_file_fixed(result)
+                
+                # 预览模式下表示"将被修复"
+                result['fixed'] = True
+            
+            return result
+        
+        except Exception as e:
+            result['error'] = str(e)
+            self.on_fix_error(result, e)
+            return result
+    
+    def update_stats(self, result: Dict):
+        """汇总单个文件的处理结果（在主进程中调用）"""
+        if 'error' in result:
+            self.stats['errors'] += 1
+        elif result['fixed']:
+            self.stats['links_fixed'] += result['links_fixed']
+            if not self.dry_run:
+                self.stats['files_fixed'] += 1
+    
+    def iter_html_files(self, exchange: str = None) -> Iterator[str]:
+        """遍历 交易所/公司 目录下的HTML文件"""
+        with os.scandir(self.storage_root) as exchange_entries:
+            for exchange_entry in exchange_entries:
+                if not exchange_entry.is_dir():
+                    continue
+                
+                if exchange and exchange_entry.name != exchange:
+                    continue
+                
+                with os.scandir(exchange_entry.path) as company_entries:
+                    for company_entry in company_entries:
+                        if company_entry.is_dir():
+                            yield from iter_html_files(company_entry.path)
+    
+    def scan_html_files(self, exchange: str = None, sample_size: int = None) -> List[Path]:
+        """扫描HTML文件"""
+        print(f"📁 扫描HTML文件...")
+        
+        if not self.storage_root.exists():
+            print(f"⚠️  存储目录不存在: {self.storage_root}")
+            return []
+        
+        # 逐个产出文件路径，抽样时只保留样本，不构建完整列表
+        paths = self.iter_html_files(exchange)
+        if sample_size:
+            paths = reservoir_sample(paths, sample_size)
+        
+        html_files = [Path(path) for path in paths]
+        
+        print(f"✅ 找到 {len(html_files)} 个HTML文件")
+        return html_files
+    
+    def run(self, exchange: str = None, sample_size: int = None):
+        """运行修复"""
+        mode_str = "预览模式" if self.dry_run else "修复模式"
+        print("\n" + "=" * 100)
+        print(f"🔧 HTML图片链接修复工具 ({mode_str})")
+        print("=" * 100 + "\n")
+        
+        html_files = self.scan_html_files(exchange, sample_size)
+        
+        if not html_files:
+            print("❌ 没有找到HTML文件")
+            return
+        
+        self.stats['total_files'] = len(html_files)
+        
+        self.prepare()
+        
+        print(f"\n开始处理 {len(html_files)} 个HTML文件...\n")
+        
+        fixed_files = []
+        
+        # 文件在多个工作进程中并行处理，统计在主进程汇总
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self,)
+        ) as executor:
+            results = executor.map(_fix_in_worker, html_files, chunksize=FIX_CHUNK_SIZE)
+            
+            last_progress = time.monotonic()
+            
+            for i, result in enumerate(results, 1):
+                now = time.monotonic()
+                if self.show_progress and now - last_progress >= PROGRESS_INTERVAL:
+                    print(f"  进度: {i}/{len(html_files)}")
+                    last_progress = now
+                
+                self.update_stats(result)
+                
+                if result['fixed']:
+                    fixed_files.append(result)
+        
+        # 打印报告
+        self.print_report(fixed_files)
@@ -1,8 +1,13 @@
 """
 SEC EDGAR API client for fetching company and filing data.
 """
+import asyncio
 import json
+import os
+import tempfile
+import time
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Optional
 from urllib.parse import urljoin
 
@@ -22,14 +27,65 @@ class SECAPIClient:
     BASE_URL = "https://www.sec.gov"
     DATA_URL = "https://data.sec.gov"
     
-    def __init__(self):
-        """Initialize SEC API client."""
+    # Max pooled connections kept open to SEC hosts
+    POOL_SIZE = 16
+
+    # Seconds a cached submissions response stays fresh
+    CACHE_TTL = 86400
+
+    # HTTP statuses cached as a tombstone for the full TTL. 403 is left out:
+    # SEC also returns it when rate-limiting or rejecting a User-Agent, so a
+    # brief block must not mark every CIK fetched during it as unavailable
+    TOMBSTONE_STATUSES = (404,)
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        cache_ttl: Optional[int] = None,
+        async_pool_size: Optional[int] = None
+    ):
+        """
+        Initialize SEC API client.
+
+        Args:
+            cache_dir: Directory for cached submissions JSON. Caching is
+                opt-in per client and disabled when None, so jobs that need
+                current data (e.g. the daily incremental) never see it
+            cache_ttl: Seconds a cached response stays fresh
+                (defaults to CACHE_TTL)
+            async_pool_size: Max pooled connections for the async client,
+                normally the caller's concurrency (defaults to POOL_SIZE)
+        """
+        self.async_pool_size = async_pool_size or self.POOL_SIZE
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.cache_ttl = cache_ttl if cache_ttl is not None else self.CACHE_TTL
         self.rate_limiter = SECRateLimiter(requests_per_second=settings.sec_rate_limit)
         self.headers = {
             "User-Agent": settings.sec_user_agent,
             "Accept": "application/json"
         }
         self.timeout = httpx.Timeout(settings.sec_timeout, read=60.0)
+        self.limits = httpx.Limits(
+            max_connections=self.POOL_SIZE,
+            max_keepalive_connections=self.POOL_SIZE
+        )
+        self.async_limits = httpx.Limits(
+            max_connections=self.async_pool_size,
+            max_keepalive_connections=self.async_pool_size
+        )
+
+        # One pooled client per SECAPIClient so keep-alive connections (and
+        # their TLS sessions) are reused across requests and threads. Pool
+        # limits belong on the transport: httpx ignores Client(limits=) when
+        # an explicit transport is passed
+        self._client = httpx.Client(
+            timeout=self.timeout,
+            follow_redirects=True,
+            http2=False,
+            transport=httpx.HTTPTransport(retries=3, limits=self.limits)
+        )
+        # Async counterpart, created lazily inside the running event loop
+        self._async_client: Optional[httpx.AsyncClient] = None
         
         logger.info("sec_api_client_initialized", user_agent=settings.sec_user_agent)
     
@@ -49,10 +105,47 @@ class SECAPIClient:
         """
         self.rate_limiter.wait()
         
-        with httpx.Client(timeout=self.timeout, follow_redirects=True, http2=False) as client:
-            response = client.get(url, headers=self.headers, follow_redirects=True)
-            response.raise_for_status()
-            return response
+        response = self._client.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response
+    
+    async def _amake_request(self, url: str) -> httpx.Response:
+        """
+        Async version of _make_request using the pooled AsyncClient.
+        
+        Args:
+            url: Full URL to request
+        
+        Returns:
+            Response object
+        
+        Raises:
+            httpx.HTTPError: On request failure
+        """
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                http2=False,
+                transport=httpx.AsyncHTTPTransport(retries=3, limits=self.async_limits)
+            )
+        
+        await self.rate_limiter.wait_async()
+        
+        response = await self._async_client.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response
+    
+    def close(self) -> None:
+        """Close pooled HTTP connections."""
+        self._client.close()
+    
+    async def aclose(self) -> None:
+        """Close pooled HTTP connections, including the async client."""
+        self._client.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
     
     @retry_with_backoff(max_attempts=3, initial_delay=10.0, exceptions=(httpx.HTTPError,))
     def fetch_company_tickers(self) -> Dict[str, Dict]:
@@ -75,27 +168,157 @@ class SECAPIClient:
         logger.info("company_tickers_fetched", count=len(data))
         return data
     
-    @retry_with_backoff(max_attempts=3, initial_delay=10.0, exceptions=(httpx.HTTPError,))
     def fetch_company_submissions(self, cik: str) -> Dict:
         """
         Fetch all submissions for a company.
 
+        When the client has a cache_dir, responses are served from the disk
+        cache while fresh. A 404 from SEC is cached as a tombstone so the same
+        bad CIK is not re-fetched until the entry expires.
+
         Args:
             cik: Company CIK (will be zero-padded to 10 digits)
 
         Returns:
             Submissions JSON data containing filings metadata
+
+        Raises:
+            httpx.HTTPStatusError: On request failure or cached tombstone
         """
         # SEC API requires CIK zero-padded to 10 digits
         cik_padded = cik.zfill(10)
         url = f"{self.DATA_URL}/submissions/CIK{cik_padded}.json"
 
+        cached = self._cached_or_raise(cik, cik_padded, url)
+        if cached is not None:
+            return cached
+
+        try:
+            data = self._fetch_submissions(cik, cik_padded, url)
+        except httpx.HTTPStatusError as e:
+            self._store_tombstone(cik_padded, e)
+            raise
+
+        self._store_submissions(cik_padded, data)
+        return data
+
+    @retry_with_backoff(max_attempts=3, initial_delay=10.0, exceptions=(httpx.HTTPError,))
+    def _fetch_submissions(self, cik: str, cik_padded: str, url: str) -> Dict:
+        """Fetch submissions JSON from SEC, bypassing the cache."""
         logger.debug("fetching_submissions", cik=cik, cik_padded=cik_padded, url=url)
 
         response = self._make_request(url)
         data = response.json()
 
         return data
+
+    async def afetch_company_submissions(self, cik: str) -> Dict:
+        """
+        Async version of fetch_company_submissions.
+
+        Shares the disk cache and tombstone handling, but awaits the request
+        so callers on an event loop do not need a worker thread per CIK.
+        Only the cache file I/O is handed to a thread.
+
+        Args:
+            cik: Company CIK (will be zero-padded to 10 digits)
+
+        Returns:
+            Submissions JSON data containing filings metadata
+
+        Raises:
+            httpx.HTTPStatusError: On request failure or cached tombstone
+        """
+        cik_padded = cik.zfill(10)
+        url = f"{self.DATA_URL}/submissions/CIK{cik_padded}.json"
+
+        # Cache file I/O runs in a worker thread so a slow disk does not
+        # stall the event loop; without a cache_dir these return immediately
+        if self.cache_dir is not None:
+            cached = await asyncio.to_thread(self._cached_or_raise, cik, cik_padded, url)
+            if cached is not None:
+                return cached
+
+        try:
+            data = await self._afetch_submissions(cik, cik_padded, url)
+        except httpx.HTTPStatusError as e:
+            if self.cache_dir is not None:
+                await asyncio.to_thread(self._store_tombstone, cik_padded, e)
+            raise
+
+        if self.cache_dir is not None:
+            await asyncio.to_thread(self._store_submissions, cik_padded, data)
+        return data
+
+    @retry_with_backoff(max_attempts=3, initial_delay=10.0, exceptions=(httpx.HTTPError,))
+    async def _afetch_submissions(self, cik: str, cik_padded: str, url: str) -> Dict:
+        """Fetch submissions JSON from SEC asynchronously, bypassing the cache."""
+        logger.debug("fetching_submissions", cik=cik, cik_padded=cik_padded, url=url)
+
+        response = await self._amake_request(url)
+        return response.json()
+
+    def _cached_or_raise(self, cik: str, cik_padded: str, url: str) -> Optional[Dict]:
+        """
+        Return fresh cached submissions, or None on a cache miss.
+
+        Raises:
+            httpx.HTTPStatusError: If the CIK is cached as a tombstone
+        """
+        cached = self._read_submissions_cache(cik_padded)
+        if cached is None:
+            return None
+
+        tombstone = cached.get('_tombstone')
+        if tombstone:
+            logger.debug("submissions_cache_tombstone", cik=cik, status=tombstone)
+            httpx.Response(tombstone, request=httpx.Request("GET", url)).raise_for_status()
+
+        logger.debug("submissions_cache_hit", cik=cik)
+        return cached
+
+    def _store_submissions(self, cik_padded: str, data: Dict) -> None:
+        """Cache a successful submissions response."""
+        self._write_submissions_cache(cik_padded, data)
+
+    def _store_tombstone(self, cik_padded: str, error: httpx.HTTPStatusError) -> None:
+        """Cache a tombstone if the failed response's status is in TOMBSTONE_STATUSES."""
+        if error.response.status_code in self.TOMBSTONE_STATUSES:
+            self._write_submissions_cache(cik_padded, {'_tombstone': error.response.status_code})
+
+    def _submissions_cache_path(self, cik_padded: str) -> Optional[Path]:
+        """Return the cache file for a CIK, or None if caching is disabled."""
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"CIK{cik_padded}.json"
+
+    def _read_submissions_cache(self, cik_padded: str) -> Optional[Dict]:
+        """Return cached submissions if present and fresh, else None."""
+        cache_path = self._submissions_cache_path(cik_padded)
+        if cache_path is None:
+            return None
+
+        try:
+            if time.time() - cache_path.stat().st_mtime > self.cache_ttl:
+                return None
+            return json.loads(cache_path.read_bytes())
+        except (OSError, ValueError):
+            return None
+
+    def _write_submissions_cache(self, cik_padded: str, data: Dict) -> None:
+        """Atomically write submissions JSON to the cache (best effort)."""
+        cache_path = self._submissions_cache_path(cik_padded)
+        if cache_path is None:
+            return
+
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json.dumps(data).encode('utf-8'))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning("submissions_cache_write_failed", path=str(cache_path), error=str(e))
     
     def download_file(self, url: str, output_path: str, chunk_size: int = 8192) -> int:
         """
@@ -113,15 +336,14 @@ class SECAPIClient:
         
         logger.debug("downloading_file", url=url, output=output_path)
         
-        with httpx.Client(timeout=self.timeout, follow_redirects=True, http2=False) as client:
-            with client.stream("GET", url, headers=self.headers, follow_redirects=True) as response:
-                response.raise_for_status()
-                
-                total_size = 0
-                with open(output_path, 'wb') as f:
-                    for chunk in response.iter_bytes(chunk_size=chunk_size):
-                        f.write(chunk)
-                        total_size += len(chunk)
+        with self._client.stream("GET", url, headers=self.headers) as response:
+            response.raise_for_status()
+            
+            total_size = 0
+            with open(output_path, 'wb') as f:
+                for chunk in response.iter_bytes(chunk_size=chunk_size):
+                    f.write(chunk)
+                    total_size += len(chunk)
         
         logger.debug("file_downloaded", url=url, size_bytes=total_size)
         return total_size
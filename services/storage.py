@@ -55,6 +55,8 @@ class LocalFileSystemAdapter(StorageAdapter):
         """
         self.root_path = Path(root_path)
         self.root_path.mkdir(parents=True, exist_ok=True)
+        # Directories already created by this adapter; skips a mkdir per write
+        self._known_dirs = set()
         logger.info("local_storage_initialized", root=str(self.root_path))
     
     def _get_full_path(self, path: str) -> Path:
@@ -64,12 +66,20 @@ class LocalFileSystemAdapter(StorageAdapter):
     def write(self, path: str, content: bytes) -> bool:
         """Write content to file."""
         full_path = self._get_full_path(path)
-        full_path.parent.mkdir(parents=True, exist_ok=True)
+        parent = full_path.parent
+        if parent not in self._known_dirs:
+            parent.mkdir(parents=True, exist_ok=True)
+            self._known_dirs.add(parent)
         
         try:
             # Use temporary file and atomic rename for safety
             temp_path = full_path.with_suffix('.tmp')
-            temp_path.write_bytes(content)
+            try:
+                temp_path.write_bytes(content)
+            except FileNotFoundError:
+                # Directory removed since it was cached; recreate once
+                parent.mkdir(parents=True, exist_ok=True)
+                temp_path.write_bytes(content)
             temp_path.replace(full_path)
             return True
         except Exception as e:
@@ -102,6 +112,7 @@ class LocalFileSystemAdapter(StorageAdapter):
         full_path = self._get_full_path(directory)
         try:
             full_path.mkdir(parents=True, exist_ok=True)
+            self._known_dirs.add(full_path)
             return True
         except Exception as e:
             logger.error("mkdir_failed", directory=directory, error=str(e))
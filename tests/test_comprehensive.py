@@ -68,6 +68,22 @@ class TestRateLimiter:
         # Should take at least 0.2 seconds for 3 requests at 10 req/sec
         assert elapsed >= 0.2
         assert limiter.request_count == 3
+    
+    def test_rate_limiter_wait_async_enforces_delay(self):
+        """Test that concurrent async waiters are spaced by the rate limit."""
+        import asyncio
+        import time
+        limiter = SECRateLimiter(requests_per_second=10)
+        
+        async def burst():
+            await asyncio.gather(*[limiter.wait_async() for _ in range(3)])
+        
+        start = time.time()
+        asyncio.run(burst())
+        elapsed = time.time() - start
+        
+        assert elapsed >= 0.2
+        assert limiter.request_count == 3
 
 
 class TestStorageService:
@@ -161,6 +177,20 @@ class TestLocalFileSystemAdapter:
             read_content = adapter.read(path)
             assert read_content == content
     
+    def test_write_recreates_removed_directory(self):
+        """Test that a cached directory removed externally is recreated on write."""
+        import shutil
+        from services.storage import LocalFileSystemAdapter
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            adapter = LocalFileSystemAdapter(tmpdir)
+            
+            assert adapter.write("test/a.txt", b"a")
+            shutil.rmtree(os.path.join(tmpdir, "test"))
+            
+            assert adapter.write("test/b.txt", b"b")
+            assert adapter.read("test/b.txt") == b"b"
+    
     def test_exists(self):
         """Test file existence check."""
         from services.storage import LocalFileSystemAdapter
@@ -189,6 +219,130 @@ class TestLocalFileSystemAdapter:
             assert os.path.isdir(full_path)
 
 
+class TestHTMLImageLinks:
+    """Test the shared HTML image link fixer code."""
+    
+    def _make_fixer(self, root, **kwargs):
+        """Build a fixer that maps image filenames to local relative paths."""
+        from pathlib import Path
+        from services.html_image_links import HTMLImageLinkFixerBase
+        
+        class FilenameFixer(HTMLImageLinkFixerBase):
+            def get_image_mapping(self, html_path, result):
+                return {"g1.jpg": "./a_image-001.jpg"}
+            
+            def resolve_src(self, src, image_mapping, index):
+                return image_mapping.get(src.rsplit('/', 1)[-1])
+        
+        fixer = FilenameFixer(**kwargs)
+        fixer.storage_root = Path(root)
+        return fixer
+    
+    def test_patch_src_bytes(self):
+        """Test that only the mapped src values are patched in place."""
+        from services.html_image_links import patch_src_bytes
+        
+        data = b'<IMG SRC="a.jpg" alt="x"><img src=\'b.jpg\'><p src="a.jpg">'
+        patched, count = patch_src_bytes(data, {"a.jpg": "./new.jpg"})
+        
+        assert count == 1
+        assert patched == b'<IMG SRC="./new.jpg" alt="x"><img src=\'b.jpg\'><p src="a.jpg">'
+    
+    def test_patch_src_bytes_ignores_data_src_and_srcset(self):
+        """Test that data-src and srcset before src are not mistaken for src."""
+        from services.html_image_links import patch_src_bytes
+        
+        data = b'<img data-src="a.jpg" srcset="a.jpg 2x" src="a.jpg">'
+        patched, count = patch_src_bytes(data, {"a.jpg": "./new.jpg"})
+        
+        assert count == 1
+        assert patched == b'<img data-src="a.jpg" srcset="a.jpg 2x" src="./new.jpg">'
+    
+    def test_iter_html_files_skips_backups(self):
+        """Test that .bak copies are not picked up as HTML files."""
+        from services.html_image_links import iter_html_files
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, "sub"))
+            for name in ("a.htm", "a.htm.bak", "sub/b.html", "sub/c.jpg"):
+                open(os.path.join(tmpdir, name), "w").close()
+            
+            found = sorted(os.path.relpath(p, tmpdir) for p in iter_html_files(tmpdir))
+            assert found == ["a.htm", os.path.join("sub", "b.html")]
+    
+    def test_reservoir_sample(self):
+        """Test sampling from an iterator of unknown length."""
+        from services.html_image_links import reservoir_sample
+        
+        assert reservoir_sample(iter(range(3)), 5) == [0, 1, 2]
+        
+        sample = reservoir_sample(iter(range(100)), 10)
+        assert len(sample) == 10
+        assert len(set(sample)) == 10
+    
+    def test_write_html_atomic_backup(self):
+        """Test that the backup keeps the original content and is never overwritten."""
+        from pathlib import Path
+        from services.html_image_links import write_html_atomic
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            html_path = Path(tmpdir) / "a.htm"
+            html_path.write_bytes(b"v1")
+            
+            write_html_atomic(html_path, b"v2", backup=True)
+            write_html_atomic(html_path, b"v3", backup=True)
+            
+            assert html_path.read_bytes() == b"v3"
+            assert (Path(tmpdir) / "a.htm.bak").read_bytes() == b"v1"
+            assert not (Path(tmpdir) / "a.htm.tmp").exists()
+    
+    def test_write_html_atomic_keeps_mode(self):
+        """Test that replacing the file keeps its permission bits."""
+        import stat
+        from pathlib import Path
+        from services.html_image_links import write_html_atomic
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            html_path = Path(tmpdir) / "a.htm"
+            html_path.write_bytes(b"v1")
+            os.chmod(html_path, 0o640)
+            
+            write_html_atomic(html_path, b"v2", backup=False)
+            
+            assert stat.S_IMODE(html_path.stat().st_mode) == 0o640
+            assert not (Path(tmpdir) / "a.htm.bak").exists()
+    
+    def test_fix_html_file(self):
+        """Test rewriting a file through a minimal mapping policy."""
+        from pathlib import Path
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            html_path = Path(tmpdir) / "a.htm"
+            html_path.write_bytes(b'<img src="https://sec/g1.jpg"><img src="other.jpg">')
+            
+            fixer = self._make_fixer(tmpdir)
+            result = fixer.fix_html_file(html_path)
+            
+            assert result["fixed"]
+            assert result["links_fixed"] == 1
+            assert html_path.read_bytes() == b'<img src="./a_image-001.jpg"><img src="other.jpg">'
+    
+    def test_fix_html_file_dry_run(self):
+        """Test that dry-run reports the fix without touching the file."""
+        from pathlib import Path
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            html_path = Path(tmpdir) / "a.htm"
+            original = b'<img src="https://sec/g1.jpg">'
+            html_path.write_bytes(original)
+            
+            fixer = self._make_fixer(tmpdir, dry_run=True)
+            result = fixer.fix_html_file(html_path)
+            
+            assert result["fixed"]
+            assert html_path.read_bytes() == original
+
+
 class TestSECAPIClient:
     """Test SEC API client."""
     
@@ -302,6 +456,135 @@ class TestSECAPIClient:
         assert len(filings) == 2
         assert filings[0]['is_amendment'] == False
         assert filings[1]['is_amendment'] == True
+    
+    def test_fetch_submissions_uses_disk_cache(self):
+        """Test that a fresh cached submissions response skips the network."""
+        from services.sec_api import SECAPIClient
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            client = SECAPIClient(cache_dir=tmpdir, cache_ttl=3600)
+            
+            mock_response = Mock()
+            mock_response.json.return_value = {"cik": "320193", "filings": {}}
+            
+            with patch.object(client, '_make_request', return_value=mock_response) as mock_request:
+                first = client.fetch_company_submissions("320193")
+                second = client.fetch_company_submissions("320193")
+            
+            assert first == second == {"cik": "320193", "filings": {}}
+            assert mock_request.call_count == 1
+            assert os.path.exists(os.path.join(tmpdir, "CIK0000320193.json"))
+    
+    def test_fetch_submissions_caches_not_found_tombstone(self):
+        """Test that a 404 is cached so the bad CIK is not re-fetched."""
+        import httpx
+        from services.sec_api import SECAPIClient
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            client = SECAPIClient(cache_dir=tmpdir, cache_ttl=3600)
+            
+            request = httpx.Request("GET", "https://data.sec.gov/submissions/CIK0000000001.json")
+            not_found = httpx.HTTPStatusError(
+                "Not Found", request=request, response=httpx.Response(404, request=request)
+            )
+            
+            with patch.object(client, '_fetch_submissions', side_effect=not_found) as mock_fetch:
+                with pytest.raises(httpx.HTTPStatusError):
+                    client.fetch_company_submissions("1")
+                with pytest.raises(httpx.HTTPStatusError) as exc_info:
+                    client.fetch_company_submissions("1")
+            
+            assert mock_fetch.call_count == 1
+            assert exc_info.value.response.status_code == 404
+    
+    def test_fetch_submissions_does_not_tombstone_forbidden(self):
+        """Test that a 403 (rate limit or User-Agent block) is not cached."""
+        import httpx
+        from services.sec_api import SECAPIClient
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            client = SECAPIClient(cache_dir=tmpdir, cache_ttl=3600)
+            
+            request = httpx.Request("GET", "https://data.sec.gov/submissions/CIK0000000001.json")
+            forbidden = httpx.HTTPStatusError(
+                "Forbidden", request=request, response=httpx.Response(403, request=request)
+            )
+            
+            with patch.object(client, '_fetch_submissions', side_effect=forbidden) as mock_fetch:
+                for _ in range(2):
+                    with pytest.raises(httpx.HTTPStatusError):
+                        client.fetch_company_submissions("1")
+            
+            assert mock_fetch.call_count == 2
+            assert os.listdir(tmpdir) == []
+    
+    def test_fetch_submissions_uncached_by_default(self):
+        """Test that a client without cache_dir always goes to the network."""
+        from services.sec_api import SECAPIClient
+        
+        client = SECAPIClient()
+        assert client.cache_dir is None
+        
+        mock_response = Mock()
+        mock_response.json.return_value = {"cik": "320193", "filings": {}}
+        
+        with patch.object(client, '_make_request', return_value=mock_response) as mock_request:
+            client.fetch_company_submissions("320193")
+            client.fetch_company_submissions("320193")
+        
+        assert mock_request.call_count == 2
+
+    def test_client_pool_sized_to_pool_size(self):
+        """Test that POOL_SIZE limits are passed to the sync transport."""
+        import httpx
+        from services.sec_api import SECAPIClient
+        
+        with patch('httpx.HTTPTransport', wraps=httpx.HTTPTransport) as transport:
+            client = SECAPIClient()
+        
+        expected = httpx.Limits(
+            max_connections=SECAPIClient.POOL_SIZE,
+            max_keepalive_connections=SECAPIClient.POOL_SIZE
+        )
+        assert client.limits == expected
+        assert transport.call_args.kwargs['limits'] == expected
+    
+    def test_async_client_pool_sized_to_async_pool_size(self):
+        """Test that async_pool_size limits are passed to the async transport."""
+        import asyncio
+        import httpx
+        from services.sec_api import SECAPIClient
+        
+        client = SECAPIClient(async_pool_size=7)
+        
+        with patch('httpx.AsyncHTTPTransport', wraps=httpx.AsyncHTTPTransport) as transport, \
+                patch('httpx.AsyncClient.get', side_effect=RuntimeError("offline")):
+            with pytest.raises(RuntimeError):
+                asyncio.run(client._amake_request("https://data.sec.gov/x.json"))
+        
+        expected = httpx.Limits(max_connections=7, max_keepalive_connections=7)
+        assert client.async_limits == expected
+        assert transport.call_args.kwargs['limits'] == expected
+    
+    def test_afetch_submissions_shares_disk_cache(self):
+        """Test that the async fetch reads the cache written by the sync fetch."""
+        import asyncio
+        from services.sec_api import SECAPIClient
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            client = SECAPIClient(cache_dir=tmpdir, cache_ttl=3600)
+            
+            mock_response = Mock()
+            mock_response.json.return_value = {"cik": "320193", "filings": {}}
+            
+            with patch.object(client, '_make_request', return_value=mock_response):
+                first = client.fetch_company_submissions("320193")
+            
+            with patch.object(client, '_amake_request') as mock_request:
+                second = asyncio.run(client.afetch_company_submissions("320193"))
+            
+            assert first == second
+            assert mock_request.call_count == 0
 
 
 class TestDatabaseModels:
@@ -1,6 +1,7 @@
 """
 Unit tests for image download functionality.
 """
+import httpx
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 
@@ -363,5 +364,58 @@ class TestDownloadAndRecordImage:
         assert "_image-999.gif" in result999.local_path
 
 
+class TestDownloadArtifactRateLimit:
+    """Tests for the HTTP 429 retries in download_artifact."""
+
+    URL = "https://www.sec.gov/Archives/edgar/data/1429/000142924000001/doc.htm"
+
+    @pytest.fixture
+    def artifact(self):
+        """Create mock artifact whose URL contains '429'."""
+        artifact = Mock()
+        artifact.id = 7
+        artifact.url = self.URL
+        artifact.retry_count = 0
+        return artifact
+
+    def _response(self, status_code):
+        """Build a response for the artifact URL."""
+        return httpx.Response(status_code, request=httpx.Request('GET', self.URL))
+
+    @patch('services.downloader.time.sleep')
+    @patch('services.downloader.httpx.get')
+    def test_non_429_error_is_not_retried(self, mock_get, mock_sleep, artifact):
+        """Test that a 404 is not mistaken for a rate limit because of the URL."""
+        mock_get.return_value = self._response(404)
+        session = MagicMock()
+
+        success = ArtifactDownloader().download_artifact(
+            session, artifact, commit=False, rate_limit_retries=3
+        )
+
+        assert not success
+        assert mock_get.call_count == 1
+        mock_sleep.assert_not_called()
+        assert artifact.retry_count == 1
+        assert session.add.call_count == 1
+
+    @patch('services.downloader.time.sleep')
+    @patch('services.downloader.httpx.get')
+    def test_429_is_retried_and_recorded_once(self, mock_get, mock_sleep, artifact):
+        """Test that 429s are retried with backoff and logged as one failure."""
+        mock_get.return_value = self._response(429)
+        session = MagicMock()
+
+        success = ArtifactDownloader().download_artifact(
+            session, artifact, commit=False, rate_limit_retries=3
+        )
+
+        assert not success
+        assert mock_get.call_count == 4
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [1.0, 2.0, 4.0]
+        assert artifact.retry_count == 1
+        assert session.add.call_count == 1
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
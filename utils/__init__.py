@@ -1,7 +1,9 @@
 """
 Retry decorator and hashing utilities.
 """
+import asyncio
 import hashlib
+import inspect
 import time
 from functools import wraps
 from typing import Callable, Any
@@ -30,8 +32,44 @@ def retry_with_backoff(
         @retry_with_backoff(max_attempts=3, initial_delay=1.0)
         def my_function():
             ...
+    
+    Coroutine functions are supported too; their backoff uses asyncio.sleep.
     """
     def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                delay = initial_delay
+                
+                for attempt in range(1, max_attempts + 1):
+                    try:
+                        return await func(*args, **kwargs)
+                    except exceptions as e:
+                        if attempt == max_attempts:
+                            logger.error(
+                                "retry_exhausted",
+                                function=func.__name__,
+                                attempts=attempt,
+                                error=str(e)
+                            )
+                            raise
+                        
+                        logger.warning(
+                            "retry_attempt",
+                            function=func.__name__,
+                            attempt=attempt,
+                            max_attempts=max_attempts,
+                            delay=delay,
+                            error=str(e)
+                        )
+                        
+                        await asyncio.sleep(delay)
+                        delay *= backoff_factor
+                
+                return None  # Should never reach here
+            
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
             delay = initial_delay
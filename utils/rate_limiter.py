@@ -1,6 +1,7 @@
 """
 Rate limiter for SEC EDGAR API compliance (max 10 req/sec).
 """
+import asyncio
 import time
 from threading import Lock
 
@@ -54,6 +55,26 @@ class SECRateLimiter:
             if self.request_count % 100 == 0:
                 logger.info("rate_limiter_stats", total_requests=self.request_count)
     
+    async def wait_async(self):
+        """
+        Async variant of wait() that yields to the event loop while throttled.
+        Shares state with wait(), so sync and async callers obey one limit.
+        """
+        with self.lock:
+            current_time = time.time()
+            # Reserve the next free slot, then sleep outside the lock
+            slot_time = max(current_time, self.last_request_time + self.min_interval)
+            self.last_request_time = slot_time
+            self.request_count += 1
+            
+            if self.request_count % 100 == 0:
+                logger.info("rate_limiter_stats", total_requests=self.request_count)
+        
+        sleep_time = slot_time - current_time
+        if sleep_time > 0:
+            logger.debug("rate_limit_wait", sleep_ms=sleep_time * 1000)
+            await asyncio.sleep(sleep_time)
+    
     def reset_stats(self):
         """Reset request counter."""
         with self.lock: